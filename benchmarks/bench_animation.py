@@ -0,0 +1,82 @@
+"""
+Benchmark the animation pipeline against the original FuncAnimation + Pillow writer round-trip.
+
+Run from the repository root:
+    python -m benchmarks.bench_animation
+    python -m benchmarks.bench_animation --iterations 50 100 200
+"""
+import argparse  # Command-line argument parsing
+import os  # Removing the temporary GIF file
+import tempfile  # Temporary GIF file of the original pipeline
+import time  # High resolution timer
+
+import matplotlib  # Library for creating static, animated, and interactive plots
+matplotlib.use('Agg')  # Use Agg backend for non-GUI rendering
+import matplotlib.pyplot as plt  # Library for plotting
+from matplotlib import animation  # Module for creating animations
+
+from models.pso import PSO  # Vectorized engine
+from utils.animation_generator import render_animation  # Current animation pipeline
+from utils.objective_functions import rastrigin_function  # Benchmark objective
+from utils.surface_grid import compute_surface  # Objective surface grid
+
+NUM_POINTS = 100
+
+
+def legacy_animation(pso, surface):
+    """The original FuncAnimation pipeline: redraw every frame and save through a temporary file."""
+    X, Y, Z = surface
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.contourf(X, Y, Z, levels=50, cmap='plasma')
+    scatter = ax.scatter([], [], color='red', s=50)
+    global_best_marker = ax.scatter([], [], color='green', s=100, marker='x')
+
+    def update(frame):
+        scatter.set_offsets(pso.history[frame])
+        global_best_marker.set_offsets([pso.best_positions_per_iteration[frame][:2]])
+        return scatter, global_best_marker
+
+    ani = animation.FuncAnimation(fig, update, frames=len(pso.history), blit=True)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".gif") as tmpfile:
+        ani.save(tmpfile.name, writer="pillow", fps=2)
+    with open(tmpfile.name, "rb") as f:
+        data = f.read()
+    os.remove(tmpfile.name)
+    plt.close(fig)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, nargs='+', default=[50, 100])
+    parser.add_argument('--particles', type=int, default=30)
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time the current pipeline")
+    args = parser.parse_args()
+
+    # Warm up matplotlib (font cache, colormaps) so the first timing is not penalized
+    warm_up = PSO(rastrigin_function, [(-5.12, 5.12)] * 2, 2, 2, False, seed=0)
+    warm_up.optimize()
+    render_animation(warm_up, 10)
+
+    print(f"{'iterations':>10} {'legacy [s]':>12} {'current [s]':>12} {'speedup':>9} {'legacy KiB':>11} {'current KiB':>12}")
+    for max_iterations in args.iterations:
+        pso = PSO(rastrigin_function, [(-5.12, 5.12)] * 2, args.particles, max_iterations, False, seed=0)
+        pso.optimize()
+        surface = compute_surface(rastrigin_function, pso.bounds, NUM_POINTS)
+
+        start = time.perf_counter()
+        current, _ = render_animation(pso, NUM_POINTS, surface=surface, max_frames=None)
+        current_time = time.perf_counter() - start
+
+        if args.skip_legacy:
+            print(f"{max_iterations:>10} {'-':>12} {current_time:>12.3f} {'-':>9} {'-':>11} {len(current) / 1024:>12.0f}")
+            continue
+        start = time.perf_counter()
+        legacy = legacy_animation(pso, surface)
+        legacy_time = time.perf_counter() - start
+        print(f"{max_iterations:>10} {legacy_time:>12.3f} {current_time:>12.3f} {legacy_time / current_time:>8.1f}x "
+              f"{len(legacy) / 1024:>11.0f} {len(current) / 1024:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark the vectorized swarm engine against the original per-particle loop.
+
+Run from the repository root:
+    python -m benchmarks.bench_engine
+    python -m benchmarks.bench_engine --particles 100 1000 5000 --iterations 100
+"""
+import argparse  # Command-line argument parsing
+import time  # High resolution timer
+
+import numpy as np  # Library for numerical operations
+
+from models.particle import Particle  # Particle object used by the original loop
+from models.pso import PSO  # Vectorized engine
+from utils.objective_functions import rastrigin_function  # Benchmark objective
+
+
+class LegacyPSO(PSO):
+    """The original `PSO.optimize()` loop over `Particle` objects, kept here as the benchmark baseline."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.particles = [Particle(self.bounds, self.rng) for _ in range(self.num_particles)]
+
+    def optimize(self):
+        for iteration in range(self.max_iterations):
+            iteration_positions = []
+            for particle in self.particles:
+                score = self.objective_function(particle.position)
+
+                if (self.is_maximization and score > particle.best_score) or \
+                   (not self.is_maximization and score < particle.best_score):
+                    particle.best_score = score
+                    particle.best_position = particle.position.copy()
+
+                if (self.is_maximization and score > self.global_best_score) or \
+                   (not self.is_maximization and score < self.global_best_score):
+                    self.global_best_score = score
+                    self.global_best_position = particle.position.copy()
+
+                inertia_component = self.inertia * particle.velocity
+                cognitive_component = self.cognitive * self.rng.random(len(self.bounds)) * (particle.best_position - particle.position)
+                social_component = self.social * self.rng.random(len(self.bounds)) * (self.global_best_position - particle.position)
+                momentum_component = 0.01 * particle.velocity if self.is_maximization else 0
+                particle.velocity = inertia_component + cognitive_component + social_component + momentum_component
+                particle.position += particle.velocity
+                particle.position = np.clip(particle.position, [lower for lower, _ in self.bounds], [upper for _, upper in self.bounds])
+                iteration_positions.append(particle.position.copy())
+
+            self.recorder.record(np.array(iteration_positions), self.global_best_position, self.global_best_score)
+        self.recorder.finish()
+
+
+def time_engine(engine_class, num_particles, max_iterations, repeats):
+    """
+    Time `optimize()` for one engine and swarm size.
+
+    Returns:
+        tuple: Best wall-clock time in seconds over `repeats` runs and the final global best score.
+    """
+    best_time = float('inf')
+    score = None
+    for _ in range(repeats):
+        pso = engine_class(rastrigin_function, [(-5.12, 5.12)] * 2, num_particles, max_iterations, False, seed=0)
+        start = time.perf_counter()
+        pso.optimize()
+        best_time = min(best_time, time.perf_counter() - start)
+        score = pso.global_best_score
+    return best_time, score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--particles', type=int, nargs='+', default=[30, 300, 1000, 3000])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'particles':>10} {'legacy [s]':>12} {'vectorized [s]':>15} {'speedup':>9} {'legacy best':>12} {'vector best':>12}")
+    for num_particles in args.particles:
+        legacy_time, legacy_score = time_engine(LegacyPSO, num_particles, args.iterations, args.repeats)
+        vector_time, vector_score = time_engine(PSO, num_particles, args.iterations, args.repeats)
+        print(f"{num_particles:>10} {legacy_time:>12.4f} {vector_time:>15.4f} {legacy_time / vector_time:>8.1f}x "
+              f"{legacy_score:>12.4g} {vector_score:>12.4g}")
+
+
+if __name__ == '__main__':
+    main()
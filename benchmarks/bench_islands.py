@@ -0,0 +1,64 @@
+"""
+Benchmark the scaling of the island model with the number of worker processes.
+
+Every run optimizes the same swarm for the same number of iterations; the objective can be made
+artificially expensive with --cost, which repeats the Rastrigin evaluation. The single-process
+PSO is the baseline of the speedup and parallel efficiency columns.
+
+Run from the repository root:
+    python -m benchmarks.bench_islands
+    python -m benchmarks.bench_islands --particles 20000 --dimensions 30 --workers 1 2 4 8 --cost 10
+"""
+import argparse  # Command-line argument parsing
+import os  # Number of CPUs
+import time  # High resolution timer
+
+from models.pso import PSO, IslandPSO  # Single-process engine and island model
+from utils.objective_functions import batch_objective, rastrigin_function  # Benchmark objective
+
+
+def expensive_objective(cost):
+    """Rastrigin evaluated `cost` times per call, standing in for an expensive objective function."""
+    @batch_objective
+    def objective(points):
+        for _ in range(cost - 1):
+            rastrigin_function(points)
+        return rastrigin_function(points)
+    return objective
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--particles', type=int, default=10000)
+    parser.add_argument('--dimensions', type=int, default=30)
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help="Numbers of islands to time")
+    parser.add_argument('--migration-interval', type=int, default=10)
+    parser.add_argument('--cost', type=int, default=1, help="Evaluations of Rastrigin per objective call")
+    args = parser.parse_args()
+
+    objective = expensive_objective(args.cost)
+    bounds = [(-5.12, 5.12)] * args.dimensions
+    print(f"{args.particles} particles, {args.dimensions} dimensions, {args.iterations} iterations, "
+          f"cost {args.cost}, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    pso = PSO(objective, bounds, args.particles, args.iterations, False, seed=0)
+    pso.optimize()
+    baseline = time.perf_counter() - start
+
+    print(f"{'workers':>8} {'time [s]':>10} {'speedup':>9} {'efficiency':>11} {'best score':>12}")
+    print(f"{'PSO':>8} {baseline:>10.3f} {1.0:>8.2f}x {'-':>11} {pso.global_best_score:>12.4f}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        pso = IslandPSO(objective, bounds, args.particles, args.iterations, False, seed=0,
+                        num_islands=workers, migration_interval=args.migration_interval)
+        pso.optimize()
+        elapsed = time.perf_counter() - start
+        speedup = baseline / elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {speedup:>8.2f}x {speedup / workers:>10.0%} {pso.global_best_score:>12.4f}")
+
+
+if __name__ == '__main__':
+    main()
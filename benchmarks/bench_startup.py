@@ -0,0 +1,77 @@
+"""
+Benchmark the cold start of the web application: import time and first-request latency.
+
+Every repeat starts a fresh Python process, imports `shell` and sends requests through the Flask
+test client: first an optimization-only request (a JSON lines history export, no plots), then
+rendering runs with different seeds so the result cache is not hit. The report shows whether
+the optimization-only request loaded Matplotlib and Pillow.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeats 10 --prewarm
+"""
+import argparse  # Command-line argument parsing
+import json  # Results of the child processes
+import os  # Environment of the child processes
+import statistics  # Median timings
+import subprocess  # Fresh interpreter per repeat
+import sys  # Interpreter path
+
+# Executed in a fresh interpreter; prints one JSON object
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+import shell
+import_seconds = time.perf_counter() - started
+client = shell.app.test_client()
+form = {'bounds': '-5.12,5.12', 'num_particles': '30', 'max_iterations': '50',
+        'objective_function_choice': 'rastrigin', 'plot_quality': 'standard'}
+
+def timed(path, data):
+    started = time.perf_counter()
+    response = client.post(path, data=data)
+    response.get_data()
+    assert response.status_code == 200, response.get_data()
+    return time.perf_counter() - started
+
+result = {'import': import_seconds, 'import_matplotlib': 'matplotlib' in sys.modules}
+result['first_export'] = timed('/export_history', {**form, 'seed': '0', 'format': 'jsonl'})
+result['export_matplotlib'] = 'matplotlib' in sys.modules
+result['export_pillow'] = 'PIL.Image' in sys.modules
+if len(sys.argv) > 1:
+    time.sleep(float(sys.argv[1]))  # Time for the background pre-warming
+for index in range(3):
+    result[f'run_{index + 1}'] = timed('/run_pso', {**form, 'seed': str(index + 1)})
+print(json.dumps(result))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5, help="Fresh processes to time")
+    parser.add_argument('--prewarm', action='store_true', help="Set PSO_PREWARM_RENDERING=1 in the child processes")
+    parser.add_argument('--idle', type=float, default=0.0, help="Seconds between the export and the first run")
+    args = parser.parse_args()
+
+    environment = dict(os.environ, PYTHONPATH=os.getcwd())
+    if args.prewarm:
+        environment['PSO_PREWARM_RENDERING'] = '1'
+    results = []
+    for _ in range(args.repeats):
+        output = subprocess.run([sys.executable, '-c', CHILD, str(args.idle)], capture_output=True, text=True,
+                                env=environment, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    def median(key):
+        return statistics.median(result[key] for result in results) * 1000
+
+    print(f"{args.repeats} fresh processes, median times")
+    print(f"{'import shell':<34} {median('import'):>9.1f} ms   matplotlib loaded: {results[0]['import_matplotlib']}")
+    print(f"{'first request, optimization only':<34} {median('first_export'):>9.1f} ms   matplotlib loaded: "
+          f"{results[0]['export_matplotlib']}, Pillow loaded: {results[0]['export_pillow']}")
+    for index in range(3):
+        print(f"{f'/run_pso request {index + 1} (renders)':<34} {median(f'run_{index + 1}'):>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
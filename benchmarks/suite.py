@@ -0,0 +1,317 @@
+"""
+Benchmark suite and regression check for the optimizer, the objective functions and the renderers.
+
+Every case is repeated at least MIN_REPEATS times and for at least MIN_SECONDS and records its
+median wall-clock time and the spread of its timings (interquartile range relative to the median);
+optimizer cases also record the median final score over several seeds, so speedups that hurt
+convergence are caught, and topology cases the median number of evaluations until a target score
+is reached. Results are written as JSON and compared against a stored baseline: the run fails
+(exit code 1) when a case's median is slower than the baseline's by more than the allowed slowdown,
+or its score is worse by more than --quality-threshold. The allowed slowdown is the larger of
+--threshold and --noise-factor times the spread measured on either side, so noisy cases get a
+wider margin; cases that look slower are measured again (--retries) before they are reported.
+Timings are machine-specific; refresh the baseline on the machine that runs the comparison.
+
+Run from the repository root:
+    python -m benchmarks.suite                          # compare against benchmarks/baseline.json
+    python -m benchmarks.suite --quick --only engine    # smaller sizes, engine cases only
+    python -m benchmarks.suite --update-baseline        # store the results as the new baseline
+"""
+import argparse  # Command-line argument parsing
+import json  # Machine-readable results
+import os  # Baseline path
+import platform  # Machine description in the results
+import statistics  # Median timings and scores
+import sys  # Exit code
+import time  # High resolution timer
+
+import numpy as np  # Library for numerical operations
+
+from models.pso import PSO  # Vectorized engine
+from utils.animation_generator import render_animation  # GIF encoding
+from utils.expression_compiler import compile_expression, _compile_normalized  # Custom expressions
+from utils.image_generator import render_3d_graph  # PNG encoding
+from utils.objective_functions import predefined_functions, rastrigin_function  # Objectives
+from utils.surface_grid import compute_surface, compute_adaptive_surface, PLOT_QUALITY_LEVELS  # Surface grid generation
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Every case is repeated at least MIN_REPEATS times and for at least MIN_SECONDS (at most MAX_REPEATS times)
+MIN_REPEATS = 7
+MIN_SECONDS = 0.5
+MAX_REPEATS = 200
+
+# Topologies and variants compared by evaluations to target: name -> PSO arguments
+VARIANTS = {
+    'gbest': {},
+    'gbest_linear_inertia_vmax': {'inertia': 0.9, 'final_inertia': 0.4, 'cognitive': 1.5, 'social': 1.5, 'max_velocity': 1.0},
+    'gbest_constriction': {'constriction': True, 'cognitive': 2.05, 'social': 2.05},
+    'ring': {'topology': 'ring', 'inertia': 0.72, 'cognitive': 1.49, 'social': 1.49},
+    'ring_constriction': {'topology': 'ring', 'constriction': True, 'cognitive': 2.05, 'social': 2.05},
+    'von_neumann': {'topology': 'von_neumann', 'inertia': 0.72, 'cognitive': 1.49, 'social': 1.49},
+    'random': {'topology': 'random', 'inertia': 0.72, 'cognitive': 1.49, 'social': 1.49},
+}
+
+# Custom expressions timed by the suite: the 2-D form and the vector form of N-D expressions
+EXPRESSIONS = {
+    'sin_cos': 'math.sin(x) + math.cos(y)',
+    'rastrigin_2d': '20 + x**2 - 10*np.cos(2*math.pi*x) + y**2 - 10*np.cos(2*math.pi*y)',
+    'rastrigin_nd': 'sum(x**2 - 10*np.cos(2*math.pi*x)) + 10*n',
+    'rosenbrock_nd': 'sum(100*(x[1:] - x[:-1]**2)**2 + (1 - x[:-1])**2)',
+}
+
+
+def measure(function, min_repeats=MIN_REPEATS, min_seconds=MIN_SECONDS, max_repeats=MAX_REPEATS):
+    """
+    Call `function` once to warm up, then until it ran `min_repeats` times and for `min_seconds`.
+
+    Returns:
+        tuple: The timings (best and median seconds, the relative spread of the timings, i.e. their
+               interquartile range divided by the median, and the number of repeats) and the last result.
+    """
+    result = function()
+    timings = []
+    total = 0.0
+    while len(timings) < max_repeats and (len(timings) < min_repeats or total < min_seconds):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+        total += timings[-1]
+    median = statistics.median(timings)
+    lower, _, upper = statistics.quantiles(timings, n=4, method='inclusive')
+    return {
+        'seconds': min(timings), 'median_seconds': median,
+        'spread': (upper - lower) / median if median else 0.0, 'repeats': len(timings),
+    }, result
+
+
+def bench_engine(quick):
+    """optimize() over particles x iterations x dimensions; the score is the median over seeds."""
+    sizes = [(30, 50, 2), (1000, 50, 10)] if quick else [(30, 100, 2), (1000, 100, 2), (1000, 100, 10), (5000, 100, 30)]
+    seeds = range(3 if quick else 5)
+    for num_particles, max_iterations, dimensions in sizes:
+        bounds = [(-5.12, 5.12)] * dimensions
+
+        def run(seed=0):
+            pso = PSO(rastrigin_function, bounds, num_particles, max_iterations, False, seed=seed)
+            pso.optimize()
+            return pso.global_best_score
+
+        timing, _ = measure(run)
+        scores = [run(seed) for seed in seeds]
+        yield f"engine/p{num_particles}_i{max_iterations}_d{dimensions}", {**timing, 'quality': statistics.median(scores)}
+
+
+def bench_topology(quick):
+    """
+    Topologies and variants on 10-D rastrigin with a target score: the score is the median final
+    score over seeds, plus the median evaluations to target of the runs that reached it.
+    """
+    bounds = [(-5.12, 5.12)] * 10
+    max_iterations = 300 if quick else 1000
+    seeds = range(5 if quick else 10)
+    for name, arguments in VARIANTS.items():
+
+        def run(seed=0):
+            pso = PSO(rastrigin_function, bounds, 40, max_iterations, False, seed=seed, target_score=20.0, **arguments)
+            pso.optimize()
+            return pso
+
+        timing, _ = measure(run)
+        runs = [run(seed) for seed in seeds]
+        reached = [pso.evaluations_to_target for pso in runs if pso.evaluations_to_target is not None]
+        yield f"topology/{name}", {
+            **timing,
+            'quality': statistics.median(pso.global_best_score for pso in runs),
+            'evaluations_to_target': statistics.median(reached) if reached else None,
+            'reached': len(reached) / len(runs),
+        }
+
+
+def bench_objectives(quick):
+    """Batch evaluation of every predefined objective function."""
+    points = np.random.default_rng(0).uniform(-5, 5, size=(10_000 if quick else 200_000, 2))
+    for name, function in predefined_functions.items():
+        timing, _ = measure(lambda: function(points))
+        yield f"objective/{name}", timing
+
+
+def bench_expressions(quick):
+    """Compiling (uncached) and evaluating custom expressions."""
+    num_points = 10_000 if quick else 200_000
+    for name, source in EXPRESSIONS.items():
+        dimensions = 10 if name.endswith('_nd') else 2
+        points = np.random.default_rng(0).uniform(-5, 5, size=(num_points, dimensions))
+
+        def compile_uncached():
+            _compile_normalized.cache_clear()
+            return compile_expression(source)
+
+        timing, function = measure(compile_uncached)
+        yield f"expression/{name}/compile", timing
+        timing, _ = measure(lambda: function(points))
+        yield f"expression/{name}/evaluate", timing
+
+
+def bench_surface(quick):
+    """Surface grid generation at several NUM_POINTS, and adaptive sampling of a smooth and a rugged function."""
+    bounds = [(-5.12, 5.12)] * 2
+    for num_points in ([50, 100] if quick else [50, 100, 200, 400]):
+        timing, _ = measure(lambda: compute_surface(rastrigin_function, bounds, num_points))
+        yield f"surface/n{num_points}", timing
+    for name in ('quadratic', 'rastrigin'):
+        for quality in PLOT_QUALITY_LEVELS:
+            function = predefined_functions[name]
+            timing, surface = measure(lambda: compute_adaptive_surface(function, bounds, quality))
+            yield f"surface/adaptive_{name}_{quality}", {**timing, 'points': int(surface.Z.size)}
+
+
+def bench_rendering(quick):
+    """PNG (3-D plot) and GIF (animation) encoding."""
+    num_points = 50 if quick else 100
+    pso = PSO(rastrigin_function, [(-5.12, 5.12)] * 2, 30, 30 if quick else 100, False, seed=0)
+    pso.optimize()
+    surface = compute_surface(rastrigin_function, pso.bounds, num_points)
+
+    timing, png = measure(lambda: render_3d_graph(rastrigin_function, pso.bounds, num_points, surface=surface))
+    yield f"render/png_n{num_points}", {**timing, 'bytes': len(png)}
+    timing, (gif, _) = measure(lambda: render_animation(pso, num_points, surface=surface))
+    yield f"render/gif_i{pso.max_iterations}", {**timing, 'bytes': len(gif)}
+
+
+SUITES = {
+    'engine': bench_engine,
+    'topology': bench_topology,
+    'objectives': bench_objectives,
+    'expressions': bench_expressions,
+    'surface': bench_surface,
+    'rendering': bench_rendering,
+}
+
+
+def run_suite(quick=False, only=None):
+    """Run the selected suites and return the results document."""
+    results = {}
+    suites = {}  # case -> suite, for measuring cases again
+    for suite_name, suite in SUITES.items():
+        if only and suite_name not in only:
+            continue
+        for case_name, metrics in suite(quick):
+            results[case_name] = metrics
+            suites[case_name] = suite_name
+            print(f"{case_name:<40} {metrics['median_seconds'] * 1000:>10.3f} ms +-{metrics['spread']:>4.0%}"
+                  + (f"   score {metrics['quality']:.4g}" if 'quality' in metrics else '')
+                  + (f"   {metrics['evaluations_to_target']:g} evaluations to target"
+                     if metrics.get('evaluations_to_target') is not None else ''), flush=True)
+    return {
+        'meta': {
+            'quick': quick,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+        'suites': suites,
+    }
+
+
+def compare(current, baseline, threshold, quality_threshold, min_difference=0.0005, noise_factor=3.0):
+    """
+    Compare results against a baseline.
+
+    Medians are compared. A case counts as slower when its median exceeds the baseline's by more
+    than the larger of `threshold` and `noise_factor` times the relative spread of either side, and
+    by more than the larger of `min_difference` seconds and the same multiple of the spread in
+    seconds, so timer noise on short or noisy cases does not count as a regression.
+
+    Returns:
+        list of tuple: `(case, kind, message)` per regression, where kind is 'time' or 'quality';
+                       cases missing from either side are skipped.
+    """
+    regressions = []
+    for name, metrics in current['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        current_median = metrics['median_seconds']
+        reference_median = reference.get('median_seconds', reference['seconds'])
+        spread = max(metrics.get('spread', 0.0), reference.get('spread', 0.0))
+        allowed_ratio = 1 + max(threshold, noise_factor * spread)
+        allowed_difference = max(min_difference, noise_factor * spread * reference_median)
+        ratio = current_median / reference_median if reference_median else 1.0
+        if ratio > allowed_ratio and current_median - reference_median > allowed_difference:
+            regressions.append((name, 'time', f"{name}: median {current_median * 1000:.3f} ms vs. baseline "
+                                              f"{reference_median * 1000:.3f} ms ({ratio:.2f}x, allowed {allowed_ratio:.2f}x)"))
+        if 'quality' in metrics and 'quality' in reference:  # Scores are minimized
+            allowed = reference['quality'] + max(1e-6, quality_threshold * abs(reference['quality']))
+            if metrics['quality'] > allowed:
+                regressions.append((name, 'quality', f"{name}: score {metrics['quality']:.6g} "
+                                                     f"vs. baseline {reference['quality']:.6g}"))
+    return regressions
+
+
+def remeasure(current, cases, quick):
+    """Run the suites of `cases` again and keep the faster median of every case (in place)."""
+    repeated = run_suite(quick, {current['suites'][name] for name in cases})
+    for name in cases:
+        metrics = repeated['results'].get(name)
+        if metrics is not None and metrics['median_seconds'] < current['results'][name]['median_seconds']:
+            current['results'][name] = metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help="Smaller problem sizes, e.g. for CI")
+    parser.add_argument('--only', nargs='+', choices=sorted(SUITES), help="Run only these suites")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Minimum allowed slowdown, e.g. 0.25 for 25%%")
+    parser.add_argument('--min-difference', type=float, default=0.0005, help="Ignore slowdowns below this many seconds")
+    parser.add_argument('--noise-factor', type=float, default=3.0,
+                        help="Widen the allowed slowdown to this multiple of the measured spread")
+    parser.add_argument('--retries', type=int, default=2, help="Measure cases that look slower again this many times")
+    parser.add_argument('--quality-threshold', type=float, default=0.5, help="Allowed relative increase of the scores")
+    parser.add_argument('--update-baseline', action='store_true', help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    current = run_suite(args.quick, args.only)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['meta'].get('quick') != args.quick:
+        print("The baseline was recorded with different problem sizes (--quick); nothing to compare.")
+        return 0
+
+    def check():
+        return compare(current, baseline, args.threshold, args.quality_threshold, args.min_difference,
+                       args.noise_factor)
+
+    regressions = check()
+    for _ in range(args.retries):
+        slower = sorted({name for name, kind, _ in regressions if kind == 'time'})
+        if not slower:
+            break
+        print(f"Measuring {len(slower)} case(s) that look slower again: {', '.join(slower)}")
+        remeasure(current, slower, args.quick)
+        regressions = check()
+    for _, _, message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import math  # Buffer sizes
+import os  # Spill file location
+import tempfile  # Anonymous memory-mapped spill files
+import numpy as np
+
+HISTORY_MODES = ('all', 'every', 'reservoir', 'keyframe', 'off')
+
+
+class HistoryRecorder:
+    """
+    Bounded recording of the swarm positions of a PSO run.
+
+    The global best position and score are small and recorded for every iteration. Particle
+    positions are stored in a buffer that is preallocated once the swarm size is known, in a
+    compact dtype, for a subset of the iterations chosen by the mode:
+
+    - 'all': every iteration.
+    - 'every': every `every`-th iteration.
+    - 'reservoir': a uniform random sample of `capacity` iterations.
+    - 'keyframe': iterations in which the global best improved or the swarm moved by more than
+      `keyframe_distance` of the search space diagonal, thinned to `capacity` by dropping every
+      other keyframe whenever the buffer is full.
+    - 'off': no positions at all.
+
+    The first and the last iteration are always kept (except in 'off' mode). The particle scores of
+    a stored iteration are recorded with `record_scores` once they are known, which is when the
+    next iteration evaluates the swarm (or, for the last one, when the run ends), so exporting the
+    history does not evaluate the objective function again. Buffers larger than
+    `spill_bytes` are backed by an anonymous memory-mapped file in `directory` instead of RAM,
+    which is removed when the recorder is closed or garbage collected.
+    """
+
+    def __init__(self, mode='all', every=1, capacity=200, dtype=np.float32, spill_bytes=256 * 1024 * 1024,
+                 directory=None, keyframe_distance=0.05, seed=None):
+        """
+        Args:
+            mode (str): One of HISTORY_MODES.
+            every (int): Sampling interval of the 'every' mode.
+            capacity (int): Maximum number of recorded iterations of the 'reservoir' and 'keyframe' modes.
+            dtype: Storage type of the positions.
+            spill_bytes (int, optional): Buffers larger than this are memory-mapped; None never spills.
+            directory (str, optional): Directory of the spill files; defaults to the temp directory.
+            keyframe_distance (float): Mean particle movement, relative to the search space diagonal,
+                                       that makes a new keyframe.
+            seed: Seed of the reservoir sampling; independent of the swarm's random numbers.
+        """
+        if mode not in HISTORY_MODES:
+            raise ValueError(f"Invalid history mode {mode!r}. Choose one of {', '.join(HISTORY_MODES)}.")
+        if every < 1 or capacity < 2:
+            raise ValueError("every must be at least 1 and capacity at least 2.")
+        self.mode = mode
+        self.every = every
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.spill_bytes = spill_bytes
+        self.directory = directory
+        self.keyframe_distance = keyframe_distance
+        self.rng = np.random.default_rng(seed)
+        self.spilled = False  # Whether the buffer is memory-mapped
+        self._spill_file = None
+        self._positions = None  # (slots, num_particles, num_dimensions) buffer
+        self._iterations = None  # Iteration of every used slot
+        self._scores = None  # (slots, num_particles) particle scores of the stored positions, NaN until known
+        self._latest_slot = None  # Slot of the most recent iteration, if it was stored
+        self._latest_scores = None
+        self._count = 0  # Number of used slots
+        self._best_positions = None  # (max_iterations, num_dimensions), every iteration
+        self._best_scores = None
+        self._num_iterations = 0  # Number of recorded iterations
+        self._latest = None  # Positions of the most recent iteration, for finish()
+        self._improved = False  # Whether the global best improved since the last keyframe
+        self._scale = 1.0  # Diagonal of the search space, for keyframe distances
+
+    def allocate(self, num_particles, num_dimensions, max_iterations, bounds=None):
+        """Preallocate the buffers for a run; called by PSO before the first iteration."""
+        slots = {
+            'all': max_iterations,
+            'every': math.ceil(max_iterations / self.every) + 1,
+            'reservoir': min(self.capacity, max_iterations) + 1,
+            'keyframe': min(self.capacity, max_iterations) + 1,
+            'off': 0,
+        }[self.mode]  # The extra slot of the sampled modes holds the last iteration
+        shape = (slots, num_particles, num_dimensions)
+        size = int(np.prod(shape)) * self.dtype.itemsize
+        self.close()
+        if self.spill_bytes is not None and size > self.spill_bytes:
+            directory = self.directory or tempfile.gettempdir()
+            os.makedirs(directory, exist_ok=True)
+            self._spill_file = tempfile.TemporaryFile(dir=directory)  # Unlinked right away, removed on close
+            self._positions = np.memmap(self._spill_file, dtype=self.dtype, mode='w+', shape=shape)
+            self.spilled = True
+        else:
+            self._positions = np.empty(shape, dtype=self.dtype)
+        self._iterations = np.empty(slots, dtype=np.int64)
+        self._scores = np.full((slots, num_particles), np.nan)
+        self._count = 0
+        self._best_positions = np.empty((max_iterations, num_dimensions), dtype=float)
+        self._best_scores = np.empty(max_iterations, dtype=float)
+        self._num_iterations = 0
+        self._latest = None
+        self._latest_slot = None
+        self._latest_scores = None
+        if bounds is not None:
+            self._scale = float(np.linalg.norm([upper - lower for lower, upper in bounds])) or 1.0
+
+    def record(self, positions, global_best_position, global_best_score):
+        """Record the state after the next iteration; `positions` is not modified and may be kept."""
+        iteration = self._num_iterations
+        if iteration and global_best_score != self._best_scores[iteration - 1]:
+            self._improved = True
+        self._best_positions[iteration] = global_best_position
+        self._best_scores[iteration] = global_best_score
+        self._num_iterations += 1
+        self._latest = positions
+        self._latest_slot = None
+        self._latest_scores = None
+
+        if self.mode == 'all' or (self.mode == 'every' and iteration % self.every == 0):
+            self._store(self._count, iteration, positions)
+        elif self.mode == 'reservoir':
+            slots = len(self._iterations) - 1
+            if self._count < slots:
+                self._store(self._count, iteration, positions)
+            else:
+                slot = self.rng.integers(1, iteration + 1)  # Slot 0 keeps the first iteration; the others sample the rest uniformly
+                if slot < slots:
+                    self._store(slot, iteration, positions)
+        elif self.mode == 'keyframe' and self._is_keyframe(positions):
+            if self._count == len(self._iterations) - 1:
+                self._thin()
+            self._store(self._count, iteration, positions)
+            self._improved = False
+
+    def record_scores(self, scores):
+        """Record the particle scores of the positions passed to the latest `record` call."""
+        self._latest_scores = scores
+        if self._latest_slot is not None:
+            self._scores[self._latest_slot] = scores
+
+    def _store(self, slot, iteration, positions):
+        self._positions[slot] = positions
+        self._iterations[slot] = iteration
+        self._scores[slot] = np.nan if self._latest_scores is None else self._latest_scores
+        self._latest_slot = slot
+        self._count = max(self._count, slot + 1)
+
+    def _is_keyframe(self, positions):
+        if self._count == 0 or self._improved:
+            return True
+        last = self._positions[self._count - 1]
+        movement = np.mean(np.linalg.norm(positions - last, axis=1))
+        return movement > self.keyframe_distance * self._scale
+
+    def _thin(self):
+        """Drop every other keyframe, keeping the first one."""
+        kept = np.arange(0, self._count, 2)
+        self._positions[:len(kept)] = self._positions[kept]
+        self._iterations[:len(kept)] = self._iterations[kept]
+        self._scores[:len(kept)] = self._scores[kept]
+        self._count = len(kept)
+
+    def finish(self):
+        """Make sure the last iteration is recorded; called when the run ends."""
+        if self.mode == 'off' or self._latest is None:
+            return
+        last_iteration = self._num_iterations - 1
+        if self._count and self._iterations[:self._count].max() == last_iteration:
+            return
+        slot = self._count if self._count < len(self._iterations) else len(self._iterations) - 1
+        self._store(slot, last_iteration, self._latest)
+
+    @property
+    def num_iterations(self):
+        """Number of iterations recorded so far."""
+        return self._num_iterations
+
+    @property
+    def iterations(self):
+        """Sorted iteration numbers (0-based) whose positions are stored."""
+        if self._count == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self._iterations[:self._count])
+
+    @property
+    def positions(self):
+        """Stored positions as a (frames, num_particles, num_dimensions) array, ordered by iteration."""
+        if self._positions is None:
+            return np.empty((0, 0, 0), dtype=self.dtype)
+        if self.mode == 'reservoir':
+            return self._positions[np.argsort(self._iterations[:self._count])]
+        return self._positions[:self._count]  # Slots are already in iteration order
+
+    @property
+    def scores(self):
+        """Particle scores of the stored positions, a (frames, num_particles) array; NaN where not recorded."""
+        if self._scores is None:
+            return np.empty((0, 0))
+        if self.mode == 'reservoir':
+            return self._scores[np.argsort(self._iterations[:self._count])]
+        return self._scores[:self._count]
+
+    @property
+    def best_positions(self):
+        """Global best position after every iteration, a (num_iterations, num_dimensions) array."""
+        if self._best_positions is None:
+            return np.empty((0, 0))
+        return self._best_positions[:self._num_iterations]
+
+    @property
+    def best_scores(self):
+        """Global best score after every iteration."""
+        if self._best_scores is None:
+            return np.empty(0)
+        return self._best_scores[:self._num_iterations]
+
+    @property
+    def nbytes(self):
+        """Size of the position buffer in bytes."""
+        return 0 if self._positions is None else self._positions.nbytes
+
+    def close(self):
+        """Release the position buffer and remove its spill file."""
+        self._positions = None
+        self._scores = None
+        self._latest = None
+        self._latest_scores = None
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        self.spilled = False
@@ -1,11 +1,29 @@
+import abc  # Abstract base class of the optimizers
+import multiprocessing  # Worker processes of the island model
+import os  # Default number of islands
+import pickle  # Checking that worker errors can be sent back to the parent
+import threading  # BrokenBarrierError raised when another island fails
+import time  # Time budget and polling the progress of the islands
+from multiprocessing import shared_memory  # Swarm state shared between the islands and the parent
 import numpy as np
-from .particle import Particle
+from models.history import HistoryRecorder
+from models.topology import constriction_factor, neighbor_indices, neighborhood_best_indices
+from utils.objective_functions import as_batch_function
 
-class PSO:
-    """Performs Particle Swarm Optimization (PSO) based on provided parameters and objective function."""
+class SwarmOptimizer(abc.ABC):
+    """
+    Swarm state, run loop, stopping criteria and results shared by `PSO` and `IslandPSO`.
 
-    def __init__(self, objective_function, bounds, num_particles, max_iterations, 
-                 is_maximization, inertia=0.6, cognitive=0.5, social=2, max_velocity=2.0):
+    `iterate` runs the loop and checks the stopping criteria after every iteration; subclasses
+    implement `_advance`, which runs one iteration and records it in the history, and may prepare
+    and tear down a run in `_start_run`, `_finish_run` and `_close_run`.
+    """
+
+    def __init__(self, objective_function, bounds, num_particles, max_iterations,
+                 is_maximization, inertia=0.6, cognitive=0.5, social=2, max_velocity=None, seed=None,
+                 patience=None, tolerance=0.0, target_score=None, min_diameter=None, time_budget=None,
+                 history_recorder=None, topology='gbest', neighborhood_size=3, constriction=False,
+                 final_inertia=None):
         """
         Initializes the PSO algorithm with given parameters.
 
@@ -17,11 +35,26 @@ class PSO:
             is_maximization: Whether to perform maximization (True) or minimization (False).
             inertia: Weight for the previous velocity (controls how much particles rely on past velocity).
             cognitive: Weight for the particle's own best position (controls exploration).
-            social: Weight for the best position of the global swarm (controls exploitation).
-            max_velocity: The maximum speed particles can move at.
+            social: Weight for the best position of the particle's neighborhood (controls exploitation).
+            max_velocity: The maximum change of a coordinate per iteration; None disables velocity clamping.
+            seed: Optional seed for the run's random number generator; runs with the same seed are reproducible.
+            patience: Stop when the global best has not improved by more than `tolerance` for this many iterations.
+            tolerance: The smallest change of the global best score that counts as an improvement.
+            target_score: Stop as soon as the global best score reaches this value.
+            min_diameter: Stop when the diagonal of the swarm's bounding box shrinks below this length.
+            time_budget: Stop after this many seconds of optimization.
+            history_recorder: The HistoryRecorder that stores the swarm positions; defaults to recording
+                              every iteration in float32.
+            topology: The neighborhood the social term is drawn to, one of `models.topology.TOPOLOGIES`.
+            neighborhood_size: Number of informants of the 'random' topology.
+            constriction: Use Clerc's constriction coefficient instead of the inertia weight; requires
+                          cognitive + social > 4.
+            final_inertia: Decrease the inertia weight linearly from `inertia` to this value over
+                           max_iterations; None keeps it constant.
         """
         # Store the function to optimize and other parameters
         self.objective_function = objective_function
+        self.batch_objective_function = as_batch_function(objective_function)  # Scores a whole swarm in one call
         self.bounds = bounds
         self.num_particles = num_particles
         self.max_iterations = max_iterations
@@ -30,74 +63,536 @@ class PSO:
         self.cognitive = cognitive  # Controls how much a particle is influenced by its own experience
         self.social = social  # Controls how much a particle is influenced by the best swarm position
         self.max_velocity = max_velocity  # The maximum speed a particle can have
-        
+        self.final_inertia = final_inertia  # Inertia weight of the last iteration, or None for a constant weight
+        self.constriction = constriction
+        self.constriction_factor = constriction_factor(cognitive, social) if constriction else None
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)  # Per-run generator instead of the global np.random state
+        self.steps = 0  # Number of calls to step()
+
+        # Neighborhoods of the social term: None for the global best, otherwise one row of indices per particle
+        self.topology = topology
+        self.neighborhood_size = neighborhood_size
+        self.neighbors = neighbor_indices(topology, num_particles, neighborhood_size, self.rng)
+
+        # Stopping criteria; the optimization always stops after max_iterations
+        self.patience = patience
+        self.tolerance = tolerance
+        self.target_score = target_score
+        self.min_diameter = min_diameter
+        self.time_budget = time_budget
+        self.stop_reason = None  # The criterion that ended the run, or 'max_iterations'
+        self.evaluations = 0  # Number of objective function evaluations
+        self.last_scores = None  # Scores of the positions the latest step started from
+
+        # Lower and upper bounds as arrays so they broadcast against the whole swarm
+        self.lower_bounds = np.array([lower for lower, _ in bounds], dtype=float)
+        self.upper_bounds = np.array([upper for _, upper in bounds], dtype=float)
+        num_dimensions = len(bounds)
+
         # Initialize the global best position randomly within the bounds
-        self.global_best_position = np.random.uniform(
-            low=[lower for lower, _ in bounds], high=[upper for _, upper in bounds]
-        )
-        
+        self.global_best_position = self.rng.uniform(low=self.lower_bounds, high=self.upper_bounds)
+
         # Set the global best score based on the optimization type (maximization or minimization)
         self.global_best_score = float('-inf') if is_maximization else float('inf')
-        
-        # Create a list of particles in the swarm
-        self.particles = [Particle(bounds) for _ in range(num_particles)]
-        
-        # Initialize the history of particle positions and best positions
-        self.history = []
-        self.best_positions_per_iteration = []
-        
-
-    def optimize(self):
-        """Runs the PSO optimization for the set number of iterations."""
-        #print(self.is_maximization)
-
-        for iteration in range(self.max_iterations):
-            iteration_positions = []  # To store the positions of particles at each iteration
-           # print(f"Starting iteration {iteration + 1}/{self.max_iterations}")
-            #print(self.objective_function)    
-            # Loop over each particle in the swarm
-            for particle in self.particles:
-                # Evaluate the particle's current position using the objective function
-                #print(f"Particle position: {particle.position}")
-                score = self.objective_function(particle.position)
-                
-
-                # If this score is better than the particle's personal best, update its best score and position
-                if (self.is_maximization and score > particle.best_score) or \
-                   (not self.is_maximization and score < particle.best_score):
-                    particle.best_score = score
-                    particle.best_position = particle.position.copy()
-
-                # If this score is better than the global best, update the global best score and position
-                if (self.is_maximization and score > self.global_best_score) or \
-                   (not self.is_maximization and score < self.global_best_score):
-                    self.global_best_score = score
-                    self.global_best_position = particle.position.copy()
-
-                # Update the particle's velocity using the inertia, cognitive, and social components
-                inertia_component = self.inertia * particle.velocity  # Particle's previous velocity
-                cognitive_component = self.cognitive * np.random.rand(len(self.bounds)) * (particle.best_position - particle.position)  # Particle's attraction to its own best position
-                social_component = self.social * np.random.rand(len(self.bounds)) * (self.global_best_position - particle.position)  # Attraction to global best position
-                momentum_component = 0.01 * particle.velocity if self.is_maximization else 0  # Optional momentum term for maximization
-                
-                # Combine the components to update the particle's velocity
-                particle.velocity = inertia_component + cognitive_component + social_component + momentum_component
-
-                # Update the particle's position based on its new velocity
-                particle.position += particle.velocity
-
-                # Ensure the particle stays within the defined bounds (clamp position)
-                particle.position = np.clip(particle.position, [lower for lower, _ in self.bounds], [upper for _, upper in self.bounds])
-                
-                # Store the updated particle position for this iteration
-                iteration_positions.append(particle.position.copy())
-
-            # Add the positions of all particles in this iteration to the history
-            self.history.append(np.array(iteration_positions))
-            
-            # Record the global best position after this iteration
-            self.best_positions_per_iteration.append(self.global_best_position.copy())
-           # print(f"Global best position after iteration {iteration + 1}: {self.global_best_position}")
-
-            # Gradually reduce the inertia over time to reduce exploration and increase exploitation
-            #self.inertia = max(1, self.inertia * 0.99)  # Inertia decreases with each iteration
+
+        # Swarm state: one row per particle
+        self.positions = self.rng.uniform(
+            self.lower_bounds, self.upper_bounds, size=(num_particles, num_dimensions)
+        )  # Random starting positions within the bounds
+        self.velocities = self.rng.uniform(-0.1, 0.1, size=(num_particles, num_dimensions))  # Small random velocities
+        self.personal_best_positions = self.positions.copy()  # Best known position of every particle
+        self.personal_best_scores = np.full(num_particles, self.global_best_score)  # Worst possible score to start with
+
+        # Recorder of the particle positions and best positions, preallocated for the whole run
+        self.recorder = history_recorder or HistoryRecorder()
+        self.recorder.allocate(num_particles, num_dimensions, max_iterations, bounds)
+
+    @property
+    def history(self):
+        """Recorded particle positions, (frames, num_particles, num_dimensions); see `recorder.iterations`."""
+        return self.recorder.positions
+
+    @property
+    def best_positions_per_iteration(self):
+        """Global best position after every iteration that ran."""
+        return self.recorder.best_positions
+
+    def evaluate(self, positions):
+        """
+        Score every row of a (num_particles, num_dimensions) array of positions.
+
+        Args:
+            positions (np.ndarray): Positions to evaluate, one particle per row.
+
+        Returns:
+            np.ndarray: A 1-D float array with one score per particle.
+        """
+        scores = np.asarray(self.batch_objective_function(positions), dtype=float)
+        self.evaluations += positions.shape[0]
+        return np.broadcast_to(scores, (positions.shape[0],))
+
+    def iterate(self):
+        """
+        Run the optimization one iteration at a time.
+
+        Yields:
+            dict: The state after each iteration with the keys `iteration` (1-based), `positions`
+                  (num_particles x num_dimensions), `global_best_position` and `global_best_score`.
+                  The arrays are the swarm's own state and must not be modified.
+        """
+        convergence = _ConvergenceMonitor(self)
+        try:
+            self._start_run()
+            for iteration in range(self.max_iterations):
+                self._advance(iteration)
+                self.stop_reason = convergence.check()
+                yield {
+                    'iteration': iteration + 1,
+                    'positions': self.positions,
+                    'global_best_position': self.global_best_position,
+                    'global_best_score': float(self.global_best_score),
+                }
+                if self.stop_reason:
+                    break
+            else:
+                self.stop_reason = 'max_iterations'
+            self._finish_run()
+            self._score_final_positions()
+            self.recorder.finish()
+        finally:
+            self._close_run()
+
+    def _start_run(self):
+        """Prepare the first iteration of a run."""
+
+    @abc.abstractmethod
+    def _advance(self, iteration):
+        """Run iteration `iteration` (0-based) and record it in the history."""
+
+    def _finish_run(self):
+        """Collect the final state after the last iteration, before the history is completed."""
+
+    def _close_run(self):
+        """Release the resources of a run, also when it failed or was abandoned."""
+
+    def _score_final_positions(self):
+        """
+        Score the positions of the last iteration for the history; no step evaluates them.
+
+        Only the recorded history needs these scores, so they are not counted in `evaluations`,
+        which stays the same whatever the history mode.
+        """
+        if self.recorder.mode != 'off' and self.recorder.num_iterations:
+            scores = np.asarray(self.batch_objective_function(self.positions), dtype=float)
+            self.recorder.record_scores(np.broadcast_to(scores, (self.num_particles,)))
+
+    @property
+    def iterations_run(self):
+        """Number of iterations that were run."""
+        return self.recorder.num_iterations
+
+    @property
+    def evaluations_to_target(self):
+        """
+        Objective function evaluations until the global best first reached `target_score`.
+
+        None without a target score or if the target was not reached.
+        """
+        if self.target_score is None:
+            return None
+        scores = self.recorder.best_scores
+        reached = scores >= self.target_score if self.is_maximization else scores <= self.target_score
+        if not reached.any():
+            return None
+        return int(np.argmax(reached) + 1) * self.num_particles
+
+    @property
+    def evaluations_saved(self):
+        """Objective function evaluations saved by stopping before max_iterations."""
+        return (self.max_iterations - self.iterations_run) * self.num_particles
+
+    def optimize(self, progress_callback=None):
+        """
+        Runs the PSO optimization for the set number of iterations.
+
+        Args:
+            progress_callback (callable, optional): Called as `progress_callback(iteration, max_iterations)`
+                                                    after every iteration, e.g. to report job progress.
+        """
+        for state in self.iterate():
+            if progress_callback is not None:
+                progress_callback(state['iteration'], self.max_iterations)
+
+
+class PSO(SwarmOptimizer):
+    """Performs Particle Swarm Optimization (PSO) based on provided parameters and objective function.
+
+    The whole swarm is stored as 2-D NumPy arrays of shape (num_particles, num_dimensions), so every
+    iteration is a handful of batched array operations instead of a Python loop over particles.
+    Local topologies (see `models.topology`) keep their neighborhoods as a precomputed index array,
+    so the neighborhood bests of the whole swarm cost one gather per iteration.
+    """
+
+    def step(self):
+        """Advance the swarm by one iteration without recording it in the history."""
+        num_dimensions = len(self.bounds)
+
+        # Evaluate the whole swarm at its current positions
+        scores = self.evaluate(self.positions)
+        self.last_scores = scores
+
+        # Update the personal best of every particle whose score improved
+        if self.is_maximization:
+            improved = scores > self.personal_best_scores
+            best_index = np.argmax(scores)
+        else:
+            improved = scores < self.personal_best_scores
+            best_index = np.argmin(scores)
+        self.personal_best_scores[improved] = scores[improved]
+        self.personal_best_positions[improved] = self.positions[improved]
+
+        # Update the global best if the best particle of this iteration beats it
+        best_score = scores[best_index]
+        global_improved = (self.is_maximization and best_score > self.global_best_score) or \
+                          (not self.is_maximization and best_score < self.global_best_score)
+        if global_improved:
+            self.global_best_score = best_score
+            self.global_best_position = self.positions[best_index].copy()
+
+        # Best position each particle is drawn to: the global best, or the best personal best of its neighborhood
+        if self.neighbors is None:
+            social_best = self.global_best_position
+        else:
+            social_best = self.personal_best_positions[
+                neighborhood_best_indices(self.neighbors, self.personal_best_scores, self.is_maximization)]
+            if self.topology == 'random' and not global_improved:
+                self.neighbors = neighbor_indices('random', self.num_particles, self.neighborhood_size, self.rng)
+
+        # Draw the random coefficients for the cognitive and social terms in one call
+        random_coefficients = self.rng.random((2, self.num_particles, num_dimensions))
+
+        # Update the velocities using the inertia (or constriction), cognitive, and social components
+        cognitive_component = self.cognitive * random_coefficients[0] * (self.personal_best_positions - self.positions)  # Attraction to own best positions
+        social_component = self.social * random_coefficients[1] * (social_best - self.positions)  # Attraction to neighborhood best positions
+        if self.constriction_factor is not None:
+            self.velocities = self.constriction_factor * (self.velocities + cognitive_component + social_component)
+        else:
+            inertia_component = self.current_inertia() * self.velocities  # Particles' previous velocities
+            self.velocities = inertia_component + cognitive_component + social_component
+        if self.max_velocity is not None:
+            np.clip(self.velocities, -self.max_velocity, self.max_velocity, out=self.velocities)  # Velocity clamping
+        self.steps += 1
+
+        # Move the particles and clamp them to the defined bounds
+        self.positions = np.clip(self.positions + self.velocities, self.lower_bounds, self.upper_bounds)
+
+    def current_inertia(self):
+        """Inertia weight of the next step: constant, or decreasing linearly to `final_inertia`."""
+        if self.final_inertia is None:
+            return self.inertia
+        progress = min(1.0, self.steps / max(1, self.max_iterations - 1))
+        return self.inertia + (self.final_inertia - self.inertia) * progress
+
+    def _advance(self, iteration):
+        self.step()
+
+        # Record the scores of the previous iteration's positions, which the step just evaluated,
+        # then the positions of all particles and the global best position after this iteration
+        self.recorder.record_scores(self.last_scores)
+        self.recorder.record(self.positions, self.global_best_position, self.global_best_score)
+
+
+class _ConvergenceMonitor:
+    """Checks the stopping criteria of a PSO run after every recorded iteration."""
+
+    def __init__(self, pso):
+        self.pso = pso
+        self.started = time.perf_counter()
+        self.reference_score = None  # Global best score at the last significant improvement
+        self.stagnant_iterations = 0
+
+    def check(self):
+        """
+        Return the name of the criterion that fired, or None to continue.
+
+        Returns:
+            str or None: 'target_score', 'stagnation', 'min_diameter', 'time_budget' or None.
+        """
+        pso = self.pso
+        score = pso.global_best_score
+        sign = -1.0 if pso.is_maximization else 1.0  # Compare as minimization
+
+        if pso.target_score is not None and sign * score <= sign * pso.target_score:
+            return 'target_score'
+
+        if pso.patience:
+            if self.reference_score is None or sign * (self.reference_score - score) > pso.tolerance:
+                self.reference_score = score
+                self.stagnant_iterations = 0
+            else:
+                self.stagnant_iterations += 1
+                if self.stagnant_iterations >= pso.patience:
+                    return 'stagnation'
+
+        if pso.min_diameter is not None:
+            positions = pso.positions
+            if np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)) < pso.min_diameter:
+                return 'min_diameter'
+
+        if pso.time_budget is not None and time.perf_counter() - self.started > pso.time_budget:
+            return 'time_budget'
+        return None
+
+
+POLL_INTERVAL = 0.001  # Seconds between two checks of the island progress
+RING_SLOTS = 8  # Iterations an island may run ahead of the parent's merged history
+
+
+def _shared_layout(num_iterations, num_particles, num_dimensions, num_islands):
+    """Return the (name, shape, dtype) of every array in the shared memory block of an island run."""
+    return [
+        ('positions', (RING_SLOTS, num_particles, num_dimensions), np.float64),  # Ring of the latest positions
+        ('scores', (RING_SLOTS, num_particles), np.float64),  # Ring of their particle scores, one iteration later
+        ('island_best_positions', (num_iterations, num_islands, num_dimensions), np.float64),  # Best of every island
+        ('island_best_scores', (num_iterations, num_islands), np.float64),
+        ('velocities', (num_particles, num_dimensions), np.float64),  # Final state of the whole swarm
+        ('personal_best_positions', (num_particles, num_dimensions), np.float64),
+        ('personal_best_scores', (num_particles,), np.float64),
+        ('progress', (num_islands,), np.int64),  # Number of finished iterations of every island
+        ('consumed', (1,), np.int64),  # Number of iterations merged by the parent
+        ('stop', (1,), np.int64),  # Set by the parent when a stopping criterion fired
+    ]
+
+
+def _layout_size(layout):
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in layout)
+
+
+def _attach_arrays(shm, layout):
+    """Return NumPy views of the arrays in a shared memory block (8-byte items, so no padding is needed)."""
+    arrays = {}
+    offset = 0
+    for name, shape, dtype in layout:
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return arrays
+
+
+def _accept_migrant(pso, position, score):
+    """Replace the particle with the worst personal best by a migrant from another island."""
+    worst = np.argmin(pso.personal_best_scores) if pso.is_maximization else np.argmax(pso.personal_best_scores)
+    pso.positions[worst] = position
+    pso.personal_best_positions[worst] = position
+    pso.personal_best_scores[worst] = score
+    if (pso.is_maximization and score > pso.global_best_score) or \
+       (not pso.is_maximization and score < pso.global_best_score):
+        pso.global_best_score = score
+        pso.global_best_position = np.array(position)
+
+
+def _run_island(shm_name, layout, island, particles, settings, seed, barrier, errors):
+    """
+    Optimize one sub-swarm in a worker process and write its state into shared memory.
+
+    Every `migration_interval` iterations the islands wait for each other, and every island
+    replaces its worst particle with the best position of the previous island (ring migration).
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = _attach_arrays(shm, layout)
+    try:
+        start, stop = particles
+        pso = PSO(settings['objective_function'], settings['bounds'], stop - start, settings['max_iterations'],
+                  settings['is_maximization'], settings['inertia'], settings['cognitive'], settings['social'],
+                  settings['max_velocity'], seed=seed,
+                  history_recorder=HistoryRecorder(mode='off'),  # The parent records the merged swarm
+                  topology=settings['topology'], neighborhood_size=settings['neighborhood_size'],
+                  constriction=settings['constriction'], final_inertia=settings['final_inertia'])
+        num_islands = arrays['progress'].shape[0]
+        migration_interval = settings['migration_interval']
+        for iteration in range(settings['max_iterations']):
+            if arrays['stop'][0]:
+                break  # The parent stopped the run early
+            pso.step()
+            arrays['island_best_positions'][iteration, island] = pso.global_best_position
+            arrays['island_best_scores'][iteration, island] = pso.global_best_score
+            if num_islands > 1 and migration_interval and (iteration + 1) % migration_interval == 0 \
+               and iteration + 1 < settings['max_iterations']:
+                try:
+                    barrier.wait()  # The bests of this iteration are written by every island
+                except threading.BrokenBarrierError:
+                    if arrays['stop'][0]:
+                        break  # Released by the parent after an early stop
+                    raise
+                source = (island - 1) % num_islands
+                _accept_migrant(pso, arrays['island_best_positions'][iteration, source],
+                                arrays['island_best_scores'][iteration, source])
+            while iteration - arrays['consumed'][0] >= RING_SLOTS and not arrays['stop'][0]:
+                time.sleep(POLL_INTERVAL)  # The ring slots are still needed by the parent
+            # Written after the migration, so the recorded positions are the ones the next step evaluates
+            arrays['positions'][iteration % RING_SLOTS, start:stop] = pso.positions
+            if iteration:
+                arrays['scores'][(iteration - 1) % RING_SLOTS, start:stop] = pso.last_scores
+            arrays['progress'][island] = iteration + 1
+        arrays['velocities'][start:stop] = pso.velocities
+        arrays['personal_best_positions'][start:stop] = pso.personal_best_positions
+        arrays['personal_best_scores'][start:stop] = pso.personal_best_scores
+    except threading.BrokenBarrierError:
+        pass  # Another island failed and reported its error
+    except Exception as e:
+        barrier.abort()  # Release the islands waiting for this one
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(f"{type(e).__name__}: {e}")  # Exceptions that cannot be sent to the parent
+        errors.put((island, e))
+    finally:
+        del arrays  # Views must be released before the block is closed
+        shm.close()
+
+
+def _process_context():
+    """Fork where available, so the objective function does not need to be picklable."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+class IslandPSO(SwarmOptimizer):
+    """
+    Island-model PSO: the swarm is split into sub-swarms that run in separate worker processes.
+
+    Every island runs the usual PSO update on its own particles, and every `migration_interval`
+    iterations the islands exchange their best positions in a ring. The positions and bests are
+    written into one shared memory block, which the parent merges into the same history recorder
+    that a single `PSO` uses. Positions go through a ring of RING_SLOTS iterations, so the shared
+    memory does not grow with the number of iterations.
+
+    Without the fork start method (e.g. on Windows) the objective function must be picklable.
+    """
+
+    def __init__(self, *args, num_islands=None, migration_interval=10, **kwargs):
+        """
+        Initializes the island model. See `SwarmOptimizer` for the other arguments; the stopping
+        criteria are checked by the parent on the merged swarm.
+
+        Args:
+            num_islands (int, optional): Number of sub-swarms and worker processes; defaults to the number of CPUs.
+            migration_interval (int): Iterations between two migrations; 0 keeps the islands independent.
+        """
+        super().__init__(*args, **kwargs)
+        self.num_islands = max(1, min(num_islands or os.cpu_count() or 1, self.num_particles))
+        self.migration_interval = migration_interval
+        boundaries = np.linspace(0, self.num_particles, self.num_islands + 1).round().astype(int)
+        self.island_particles = list(zip(boundaries[:-1].tolist(), boundaries[1:].tolist()))  # (start, stop) rows
+
+        # Resources of the running islands, see _start_run
+        self._shm = None
+        self._arrays = None
+        self._barrier = None
+        self._errors = None
+        self._workers = []
+
+    def _start_run(self):
+        """Create the shared memory block and start one worker process per island."""
+        num_dimensions = len(self.bounds)
+        layout = _shared_layout(self.max_iterations, self.num_particles, num_dimensions, self.num_islands)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, _layout_size(layout)))
+        self._arrays = _attach_arrays(self._shm, layout)
+        self._arrays['progress'][:] = 0
+        self._arrays['consumed'][:] = 0
+        self._arrays['stop'][:] = 0
+
+        context = _process_context()
+        self._barrier = context.Barrier(self.num_islands)
+        self._errors = context.Queue()
+        settings = {
+            'objective_function': self.objective_function, 'bounds': self.bounds,
+            'max_iterations': self.max_iterations, 'is_maximization': self.is_maximization,
+            'inertia': self.inertia, 'cognitive': self.cognitive, 'social': self.social,
+            'max_velocity': self.max_velocity, 'migration_interval': self.migration_interval,
+            'topology': self.topology, 'neighborhood_size': self.neighborhood_size,
+            'constriction': self.constriction, 'final_inertia': self.final_inertia,
+        }
+        seeds = np.random.SeedSequence(self.seed).spawn(self.num_islands)  # Independent, reproducible streams
+        self._workers = [
+            context.Process(target=_run_island,
+                            args=(self._shm.name, layout, island, particles, settings, seeds[island],
+                                  self._barrier, self._errors))
+            for island, particles in enumerate(self.island_particles)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _advance(self, iteration):
+        """
+        Wait until every island finished the iteration and merge it into the history.
+
+        Raises:
+            Exception: The first error raised by an island, e.g. while evaluating the objective function.
+        """
+        while self._arrays['progress'].min() <= iteration:  # Wait until every island finished this iteration
+            self._check_islands(self._workers, self._errors)
+            time.sleep(POLL_INTERVAL)
+        self._record(self._arrays, iteration)
+
+    def _finish_run(self):
+        """Stop the islands and copy the final state of the merged swarm."""
+        arrays = self._arrays
+        if self.stop_reason != 'max_iterations':
+            arrays['stop'][0] = 1
+            self._barrier.abort()  # Release islands waiting to migrate
+        for worker in self._workers:
+            worker.join()
+        self._check_islands(self._workers, self._errors)
+
+        # Islands may have run ahead of the merged history before they saw the stop flag
+        island_sizes = np.array([stop - start for start, stop in self.island_particles])
+        self.evaluations = int(arrays['progress'] @ island_sizes)
+
+        if self.iterations_run:
+            self.velocities = arrays['velocities'].copy()
+            self.personal_best_positions = arrays['personal_best_positions'].copy()
+            self.personal_best_scores = arrays['personal_best_scores'].copy()
+
+    def _close_run(self):
+        """Stop the islands that are still running and release the shared memory block."""
+        for worker in self._workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self._workers = []
+        if self._errors is not None:
+            self._errors.close()
+            self._errors = None
+        self._arrays = None  # Views must be released before the block is closed
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _record(self, arrays, iteration):
+        """Merge the island states of one iteration into the history and the global best."""
+        self.positions = arrays['positions'][iteration % RING_SLOTS].copy()
+        if iteration:
+            self.recorder.record_scores(arrays['scores'][(iteration - 1) % RING_SLOTS].copy())
+        arrays['consumed'][0] = iteration + 1  # Frees the ring slots for the islands
+        scores = arrays['island_best_scores'][iteration]
+        best_island = np.argmax(scores) if self.is_maximization else np.argmin(scores)
+        self.global_best_score = float(scores[best_island])
+        self.global_best_position = arrays['island_best_positions'][iteration, best_island].copy()
+        self.recorder.record(self.positions, self.global_best_position, self.global_best_score)
+
+    @staticmethod
+    def _check_islands(workers, errors):
+        """Raise the error of a failed island, or an error if a worker died without reporting one."""
+        if not errors.empty():
+            _, error = errors.get()
+            raise error
+        for island, worker in enumerate(workers):
+            if worker.exitcode not in (None, 0):
+                time.sleep(POLL_INTERVAL)  # Give the queue feeder of the worker a moment
+                if not errors.empty():
+                    _, error = errors.get()
+                    raise error
+                raise RuntimeError(f"Island {island} stopped unexpectedly (exit code {worker.exitcode}).")
@@ -0,0 +1,76 @@
+import math  # Side length of the von Neumann lattice
+import numpy as np
+
+TOPOLOGIES = ('gbest', 'ring', 'von_neumann', 'random')
+
+
+def neighbor_indices(topology, num_particles, neighborhood_size=3, rng=None):
+    """
+    Return the particles every particle learns from, as a precomputed index array.
+
+    Row i holds the indices of the neighborhood of particle i, the particle itself first, so the
+    neighborhood bests of the whole swarm are one gather of the personal best scores followed by an
+    argmin/argmax along the rows (see `neighborhood_best_indices`).
+
+    - 'gbest': every particle learns from the whole swarm; returns None, the global best is used directly.
+    - 'ring': the particles before and after it in a ring (lbest with radius 1).
+    - 'von_neumann': its four neighbors on a helical 2-D lattice with about sqrt(num_particles)
+      columns (left, right, up and down), which works for every swarm size.
+    - 'random': `neighborhood_size` informants drawn at random (with repetition); `PSO` redraws
+      them after every iteration that did not improve the global best.
+
+    Args:
+        topology (str): One of TOPOLOGIES.
+        num_particles (int): The number of particles in the swarm.
+        neighborhood_size (int): Number of informants of the 'random' topology.
+        rng (np.random.Generator, optional): Generator of the 'random' topology.
+
+    Returns:
+        np.ndarray or None: An int array of shape (num_particles, neighborhood size + 1).
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology '{topology}', expected one of {', '.join(TOPOLOGIES)}.")
+    if topology == 'gbest':
+        return None
+
+    particles = np.arange(num_particles)
+    if topology == 'ring':
+        offsets = np.array([0, -1, 1])
+    elif topology == 'von_neumann':
+        columns = max(1, round(math.sqrt(num_particles)))
+        offsets = np.array([0, -1, 1, -columns, columns])
+    else:
+        rng = rng if rng is not None else np.random.default_rng()
+        informants = rng.integers(0, num_particles, size=(num_particles, max(1, neighborhood_size)))
+        return np.column_stack([particles, informants])
+    return (particles[:, None] + offsets) % num_particles
+
+
+def neighborhood_best_indices(neighbors, scores, is_maximization):
+    """
+    Return the index of the best particle in every neighborhood.
+
+    Args:
+        neighbors (np.ndarray): The neighborhoods, see `neighbor_indices`.
+        scores (np.ndarray): The personal best score of every particle.
+        is_maximization (bool): Whether higher scores are better.
+
+    Returns:
+        np.ndarray: One particle index per row of `neighbors`.
+    """
+    neighbor_scores = scores[neighbors]  # One gather for the whole swarm
+    best = np.argmax(neighbor_scores, axis=1) if is_maximization else np.argmin(neighbor_scores, axis=1)
+    return np.take_along_axis(neighbors, best[:, None], axis=1)[:, 0]
+
+
+def constriction_factor(cognitive, social):
+    """
+    Return Clerc's constriction coefficient chi = 2 / |2 - phi - sqrt(phi^2 - 4 phi)| with phi = cognitive + social.
+
+    Raises:
+        ValueError: If phi is not above 4, where the coefficient is undefined.
+    """
+    phi = cognitive + social
+    if phi <= 4:
+        raise ValueError("Constriction requires cognitive + social > 4, e.g. 2.05 each.")
+    return 2.0 / abs(2.0 - phi - math.sqrt(phi * phi - 4.0 * phi))
@@ -1,136 +1,575 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from models.pso import PSO  # Import the PSO class from a separate module
+import os  # Environment-based configuration
+import json  # Serialization of streamed events
+import logging  # Structured request logs
+import threading  # Thread of the request being profiled
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context, url_for
 from utils.objective_functions import predefined_functions  # Import predefined objective functions
-from utils.file_handling import parse_file, create_text_file  # Utilities for file parsing and creation
-from utils.animation_generator import create_animation  # Utility to generate animations of PSO results
-from utils.image_generator import create_3d_graph  # Utility to generate 3D plots of the objective function
-import math  # Import math library for complex evaluations in custom functions
-import matplotlib  # Library for creating visualizations
-matplotlib.use('Agg')  # Use Agg backend for non-GUI rendering (required for servers without a display)
+from utils.expression_compiler import ExpressionError  # Raised for invalid custom functions
+from utils.file_handling import parse_file, iter_parameter_sets  # Utilities for file parsing
+from utils.pso_runner import validate_objective_function, execute_run, optimize_run, stream_run, artifact_store, result_cache, RunError  # Optimization and rendering stages
+from utils.history_export import export_history, EXPORT_FORMATS  # Streamed history downloads
+from utils.surface_grid import surface_cache  # Cached objective surfaces
+from utils.expression_compiler import compile_cache_info  # Compiled expression cache statistics
+from utils.job_queue import JobManager, JobQueueFull  # Bounded worker pool for asynchronous runs
+from models.history import HISTORY_MODES  # Valid history recording modes
+from models.topology import TOPOLOGIES  # Valid neighborhood topologies
+from utils.surface_grid import PLOT_QUALITIES  # Plot resolution levels
+from utils.sweep import SweepRunner, parse_sweep, expand_sweep, csv_row, RESULT_COLUMNS  # Parameter sweeps
+from utils.instrumentation import RunMetrics, SamplingProfiler, observe_run, stage  # Per-request timings and profiles
+from utils.metrics import registry, REQUEST_DURATION, REQUESTS, PEAK_MEMORY  # Prometheus metrics of this process
+from utils.figures import prewarm as prewarm_figures  # Loading the plotting stack ahead of the first render
 
 # Initialize the Flask app
 app = Flask(__name__)
 NUM_POINTS = 100
+MAX_ISLANDS = int(os.environ.get('PSO_MAX_ISLANDS', os.cpu_count() or 1))  # Upper limit of worker processes per run
+
+# Default PSO parameters of a run
+DEFAULT_PARAMS = {
+    'bounds': "-10,10",  # Search space bounds
+    'num_particles': 30,  # Number of particles in the swarm
+    'max_iterations': 50,  # Number of iterations
+    'inertia': 0.6,  # Inertia weight for velocity update
+    'cognitive': 0.5,  # Cognitive (personal) learning coefficient
+    'social': 2.0,  # Social (group) learning coefficient
+    'final_inertia': None,  # Decrease the inertia weight linearly to this value; constant if not given
+    'constriction': False,  # Clerc's constriction coefficient instead of the inertia weight
+    'max_velocity': None,  # Velocity clamping per coordinate; off if not given
+    'topology': 'gbest',  # Neighborhood of the social term: gbest, ring, von_neumann or random
+    'neighborhood_size': 3,  # Informants per particle of the random topology
+    'is_maximization': False,  # Objective is minimization by default
+    'seed': None,  # Random seed; seeded runs are reproducible and cached
+    'animation_format': 'gif',  # gif, or mp4/webm when ffmpeg is installed
+    'max_frames': 200,  # Longer runs are decimated to this many animation frames
+    'dimensions': None,  # Number of dimensions; taken from the bounds if not given
+    'plot_dims': "0,1",  # The two dimensions shown in the plots
+    'slice_anchor': 'best',  # Other dimensions are held at the global best ("best") or the center ("center")
+    'plot_quality': 'standard',  # Adaptive plot grid (draft, standard, high) or a fixed NUM_POINTS grid ("fixed")
+    'islands': 1,  # Number of sub-swarms run in parallel worker processes
+    'migration_interval': 10,  # Iterations between two exchanges of the island bests
+    'patience': None,  # Stop after this many iterations without improvement
+    'tolerance': 0.0,  # Smallest change of the best score that counts as an improvement
+    'target_score': None,  # Stop once the best score reaches this value
+    'min_diameter': None,  # Stop once the swarm has collapsed to this size
+    'time_budget': None,  # Stop after this many seconds
+    'history_mode': 'every',  # Recorded positions: all, every (k-th iteration), reservoir, keyframe or off
+    'history_every': None,  # k of the every mode; by default max_iterations / max_frames
+    'history_capacity': None  # Recorded iterations of the reservoir and keyframe modes; by default max_frames
+}
+
+# Worker pool for job mode, sized from the environment
+job_manager = JobManager(
+    max_workers=int(os.environ.get('PSO_JOB_WORKERS', os.cpu_count() or 1)),
+    max_queue_depth=int(os.environ.get('PSO_JOB_QUEUE_DEPTH', 8)),
+    max_jobs_per_client=int(os.environ.get('PSO_JOBS_PER_CLIENT', 2)),
+)
+
+# Worker pool shared by all parameter sweeps
+sweep_runner = SweepRunner(
+    max_workers=int(os.environ.get('PSO_SWEEP_WORKERS', os.cpu_count() or 1)),
+    max_runs=int(os.environ.get('PSO_SWEEP_MAX_RUNS', 1000)),
+)
+
+TRACE_MEMORY = os.environ.get('PSO_TRACE_MEMORY', '') == '1'  # Peak of traced allocations instead of the sampled process RSS
+PROFILING_ENABLED = os.environ.get('PSO_PROFILING', '') == '1'  # Allow `?profile=1` to sample a request's stacks
+PREWARM_RENDERING = os.environ.get('PSO_PREWARM_RENDERING', '') == '1'  # Load the plotting stack at start-up
+request_log = logging.getLogger('pso.requests')
+
+if PREWARM_RENDERING:  # In the background, so start-up and requests that do not render are not delayed
+    threading.Thread(target=prewarm_figures, name='pso-prewarm', daemon=True).start()
+
+@app.before_request
+def start_request_metrics():
+    """Collect stage timings for the request and start the sampling profiler if requested."""
+    g.metrics = RunMetrics(trace_memory=TRACE_MEMORY).activate()
+    g.profiler = None
+    if PROFILING_ENABLED and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'):
+        g.profiler = SamplingProfiler(threading.get_ident()).start()
+
+@app.after_request
+def finish_request_metrics(response):
+    """
+    Add the Server-Timing header, log the request as one JSON line and update the metrics.
+
+    Streamed responses do their work while the body is sent, after this hook: they are measured
+    until the response is closed, and their log line carries the profile URL instead of a header.
+    """
+    metrics = g.pop('metrics', None)
+    if metrics is None:
+        return response
+    profiler = g.pop('profiler', None)
+    record = {'method': request.method, 'path': request.path, 'endpoint': request.endpoint or 'unknown',
+              'status': response.status_code}
+    url_adapter = app.create_url_adapter(request)  # Builds the profile URL after the request context is gone
+
+    if response.is_streamed and not response.direct_passthrough:  # Generated bodies, not files
+        metrics.detach()
+        response.response = metrics.wrap_stream(response.response)
+        response.call_on_close(lambda: record_request(metrics, profiler, record, url_adapter))
+        return response
+
+    timing = metrics.server_timing()
+    profile_url = record_request(metrics, profiler, record, url_adapter)
+    response.headers['Server-Timing'] = timing
+    if profile_url is not None:
+        response.headers['X-Profile-URL'] = profile_url
+    return response
+
+def record_request(metrics, profiler, record, url_adapter):
+    """
+    Stop collecting for a request, update the metrics and log it as one JSON line.
+
+    Returns:
+        str or None: The URL of the stored profile, if the request was profiled.
+    """
+    metrics.deactivate()
+    profile_url = None
+    if profiler is not None:
+        profiler.stop()
+        profile_id = artifact_store.put(profiler.collapsed(), 'text/plain')
+        profile_url = url_adapter.build('get_artifact', {'artifact_id': profile_id})
+
+    endpoint = record['endpoint']
+    REQUEST_DURATION.observe(metrics.elapsed, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=record['status'])
+    if metrics.peak_memory_bytes is not None:
+        PEAK_MEMORY.observe(metrics.peak_memory_bytes, endpoint=endpoint, source=metrics.peak_memory_source)
+    observe_run(metrics)
+    request_log.info(json.dumps({
+        **record, 'duration_seconds': round(metrics.elapsed, 6), **metrics.to_dict(),
+        **({'profile_url': profile_url} if profile_url is not None else {}),
+    }))
+    return profile_url
+
+@app.teardown_request
+def discard_request_metrics(error=None):
+    """Stop collecting if the request failed before `finish_request_metrics` ran."""
+    metrics = g.pop('metrics', None)
+    if metrics is not None:
+        metrics.deactivate()
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
 
 @app.route('/')
 def index():
     """Render the main page with a form for PSO parameter inputs."""
     return render_template('index.html', predefined_functions=predefined_functions)
 
-@app.route('/run_pso', methods=['POST'])
-def run_pso():
+def parse_bounds(bounds_input, dimensions=None):
     """
-    Handle the form submission or file upload to run PSO (Particle Swarm Optimization).
-    Process inputs, configure PSO parameters, execute the optimization, and return results.
+    Parse search space bounds.
+
+    Args:
+        bounds_input (str): Either "lower,upper" applied to every dimension, or one
+                            "lower,upper" pair per dimension separated by semicolons.
+        dimensions (int, optional): Number of dimensions; defaults to the number of pairs, or 2 for a single pair.
+
+    Returns:
+        list of tuples: One (lower, upper) tuple per dimension.
+
+    Raises:
+        ValueError: If the bounds are malformed or do not match the number of dimensions.
+    """
+    try:
+        pairs = [tuple(map(float, pair.split(','))) for pair in bounds_input.split(';') if pair.strip()]
+    except ValueError:
+        pairs = None
+    if not pairs or any(len(pair) != 2 for pair in pairs):
+        raise ValueError("Invalid bounds format. Enter two numerical values separated by a comma, "
+                         "or one such pair per dimension separated by semicolons.")
+    if any(lower >= upper for lower, upper in pairs):
+        raise ValueError("Each lower bound must be smaller than its upper bound.")
+    if len(pairs) == 1:
+        return pairs * (dimensions or 2)  # Same bounds for every dimension
+    if dimensions and dimensions != len(pairs):
+        raise ValueError(f"Expected {dimensions} bounds pairs, got {len(pairs)}.")
+    return pairs
+
+def parse_run_request(form, files):
+    """
+    Build a run configuration from submitted form fields or an uploaded parameter file.
+
+    Args:
+        form: The submitted form fields (a mapping such as `request.form`).
+        files: The uploaded files (a mapping such as `request.files`).
+
+    Returns:
+        dict: Run configuration with the PSO parameters and the objective function definition.
+
+    Raises:
+        ValueError: If the input is invalid; the message is suitable for a 400 response.
     """
     # Determine input type (form input or file upload)
-    input_type = request.form.get('input_type', 'form')
-
-    # Default PSO parameters
-    params = {
-        'bounds': "-10,10",  # Search space bounds
-        'num_particles': 30,  # Number of particles in the swarm
-        'max_iterations': 50,  # Number of iterations
-        'inertia': 0.6,  # Inertia weight for velocity update
-        'cognitive': 0.5,  # Cognitive (personal) learning coefficient
-        'social': 2.0,  # Social (group) learning coefficient
-        'is_maximization': False  # Objective is minimization by default
-    }
+    input_type = form.get('input_type', 'form')
+
+    params = dict(DEFAULT_PARAMS)  # Default PSO parameters
     custom_function_code = None  # Store custom objective function code if provided
     bounds_input = params['bounds']  # Default bounds
 
     # Handle file upload for parameters
     if input_type == 'file':
-        param_file = request.files.get('param_file')
-        if param_file:
-            try:
-                # Parse file to extract parameters and custom function code
-                params, custom_function_code = parse_file(param_file, params)
-                bounds_input = params.get('bounds', bounds_input)
-            except ValueError as e:
-                return jsonify({"error": str(e)}), 400
-        else:
-            return jsonify({"error": "File upload is required when input type is file."}), 400
+        param_file = files.get('param_file')
+        if not param_file:
+            raise ValueError("File upload is required when input type is file.")
+        # Parse file to extract parameters and custom function code
+        params, custom_function_code = parse_file(param_file, params)
+        bounds_input = params.get('bounds', bounds_input)
 
     # Handle form input for parameters
     else:
-        bounds_input = request.form.get('bounds', params['bounds'])
-        params['num_particles'] = int(request.form.get('num_particles', params['num_particles']))
-        params['max_iterations'] = int(request.form.get('max_iterations', params['max_iterations']))
-        params['inertia'] = float(request.form.get('inertia', params['inertia']))
-        params['cognitive'] = float(request.form.get('cognitive', params['cognitive']))
-        params['social'] = float(request.form.get('social', params['social']))
-        params['is_maximization'] = request.form.get('is_maximization', str(params['is_maximization'])).lower() == 'on'
+        bounds_input = form.get('bounds', params['bounds'])
+        try:
+            params['num_particles'] = int(form.get('num_particles', params['num_particles']))
+            params['max_iterations'] = int(form.get('max_iterations', params['max_iterations']))
+            params['inertia'] = float(form.get('inertia', params['inertia']))
+            params['cognitive'] = float(form.get('cognitive', params['cognitive']))
+            params['social'] = float(form.get('social', params['social']))
+            params['neighborhood_size'] = int(form.get('neighborhood_size', params['neighborhood_size']) or params['neighborhood_size'])
+            params['seed'] = int(form['seed']) if form.get('seed', '').strip() else None
+            params['max_frames'] = int(form.get('max_frames', params['max_frames']))
+            params['dimensions'] = int(form['dimensions']) if form.get('dimensions', '').strip() else None
+            params['islands'] = int(form.get('islands', params['islands']) or params['islands'])
+            params['migration_interval'] = int(form.get('migration_interval', params['migration_interval']) or 0)
+            params['patience'] = int(form['patience']) if form.get('patience', '').strip() else None
+            params['tolerance'] = float(form.get('tolerance', params['tolerance']) or 0.0)
+            for key in ('target_score', 'min_diameter', 'time_budget', 'max_velocity', 'final_inertia'):
+                params[key] = float(form[key]) if form.get(key, '').strip() else None
+            for key in ('history_every', 'history_capacity'):
+                params[key] = int(form[key]) if form.get(key, '').strip() else None
+        except ValueError:
+            raise ValueError("Invalid numeric parameter.") from None
+        params['is_maximization'] = form.get('is_maximization', str(params['is_maximization'])).lower() == 'on'
+        params['constriction'] = form.get('constriction', str(params['constriction'])).lower() == 'on'
+        params['topology'] = form.get('topology', params['topology']).lower()
+        params['animation_format'] = form.get('animation_format', params['animation_format']).lower()
+        params['plot_dims'] = form.get('plot_dims', params['plot_dims']) or params['plot_dims']
+        params['slice_anchor'] = form.get('slice_anchor', params['slice_anchor']).lower()
+        params['plot_quality'] = form.get('plot_quality', params['plot_quality']).lower()
+        params['history_mode'] = form.get('history_mode', params['history_mode']).lower()
+
+    return build_run_config(params, bounds_input, custom_function_code, form)
+
+def build_run_config(params, bounds_input, custom_function_code, form):
+    """
+    Validate the parameters of one run and build its run configuration.
+
+    Args:
+        params (dict): The parameters, starting from DEFAULT_PARAMS.
+        bounds_input (str): The bounds as entered, see `parse_bounds`.
+        custom_function_code (str, optional): The function block of a parameter file.
+        form: The submitted form fields, for the objective function choice and the math expression.
+
+    Returns:
+        dict: Run configuration with the PSO parameters and the objective function definition.
+
+    Raises:
+        ValueError: If a parameter is invalid; the message is suitable for a 400 response.
+    """
+    if params['animation_format'] not in ('gif', 'mp4', 'webm'):
+        raise ValueError("Invalid animation format. Choose gif, mp4 or webm.")
+    if params['num_particles'] < 1:
+        raise ValueError("num_particles must be a positive integer.")
+    if params['max_iterations'] < 1:
+        raise ValueError("max_iterations must be a positive integer.")
+    if params['max_frames'] <= 0:
+        raise ValueError("max_frames must be a positive integer.")
+    if not 1 <= params['islands'] <= MAX_ISLANDS:
+        raise ValueError(f"islands must be between 1 and {MAX_ISLANDS}.")
+    if params['migration_interval'] < 0:
+        raise ValueError("migration_interval must not be negative.")
+    if params['patience'] is not None and params['patience'] <= 0:
+        raise ValueError("patience must be a positive integer.")
+    if params['tolerance'] < 0:
+        raise ValueError("tolerance must not be negative.")
+    for key in ('min_diameter', 'time_budget', 'max_velocity'):
+        if params[key] is not None and params[key] <= 0:
+            raise ValueError(f"{key} must be a positive number.")
+    if params['topology'] not in TOPOLOGIES:
+        raise ValueError(f"Invalid topology. Choose one of {', '.join(TOPOLOGIES)}.")
+    if params['neighborhood_size'] < 1:
+        raise ValueError("neighborhood_size must be a positive integer.")
+    if params['constriction'] and params['cognitive'] + params['social'] <= 4:
+        raise ValueError("Constriction requires cognitive + social > 4, e.g. 2.05 each.")
+    if params['history_mode'] not in HISTORY_MODES:
+        raise ValueError(f"Invalid history mode. Choose one of {', '.join(HISTORY_MODES)}.")
+    if (params['history_every'] is not None and params['history_every'] < 1) or \
+       (params['history_capacity'] is not None and params['history_capacity'] < 2):
+        raise ValueError("history_every must be at least 1 and history_capacity at least 2.")
 
     # Parse and validate bounds
+    if params['dimensions'] is not None and params['dimensions'] < 2:
+        raise ValueError("dimensions must be at least 2.")
+    params['bounds'] = parse_bounds(bounds_input, params['dimensions'])
+    params['dimensions'] = len(params['bounds'])
+
+    # Parse and validate the plotted dimensions
     try:
-        lower, upper = map(float, bounds_input.split(','))
-        params['bounds'] = [(lower, upper), (lower, upper)]  # Set bounds for both dimensions
+        params['plot_dims'] = [int(dim) for dim in str(params['plot_dims']).split(',')]
     except ValueError:
-        return jsonify({"error": "Invalid bounds format. Enter two numerical values separated by a comma."}), 400
+        raise ValueError("plot_dims must be two dimension indices separated by a comma.") from None
+    if len(params['plot_dims']) != 2 or params['plot_dims'][0] == params['plot_dims'][1] or \
+       not all(0 <= dim < params['dimensions'] for dim in params['plot_dims']):
+        raise ValueError(f"plot_dims must be two different dimension indices between 0 and {params['dimensions'] - 1}.")
+    if params['slice_anchor'] not in ('best', 'center'):
+        raise ValueError("slice_anchor must be best or center.")
+    if params['plot_quality'] not in PLOT_QUALITIES:
+        raise ValueError(f"Invalid plot quality. Choose one of {', '.join(PLOT_QUALITIES)}.")
 
     # Define the objective function
-    objective_function_choice = request.form.get('objective_function_choice', 'quadratic')
-    math_expr = None  # For rendering custom functions in math format
+    objective_function_choice = form.get('objective_function_choice', 'quadratic')
+    run_config = {
+        'params': params,
+        'objective_function_choice': objective_function_choice,
+        'math_expr': form.get('math_expr') if objective_function_choice == 'custom' and not custom_function_code else None,  # For rendering custom functions in math format
+        'custom_function_code': custom_function_code,
+    }
 
-    if custom_function_code:
-        # Handle custom function code provided via file upload
+    # Validate the objective function up front (custom functions are compiled and cached)
+    try:
+        validate_objective_function(run_config)
+    except ExpressionError as e:
+        raise ValueError(f"Error defining custom function: {str(e)}") from None
+    return run_config
+
+def artifact_urls(result):
+    """Turn the artifact ids of a run result into the URLs of the response payload."""
+    return {
+        'matplot_3d_img_url': url_for('get_artifact', artifact_id=result['surface_plot_id']),
+        'matplot_animation_url': url_for('get_artifact', artifact_id=result['animation_id']),
+        'animation_mime_type': result['animation_mime_type'],
+        'text_file_url': url_for('download_best_particle_file', id=result['text_file_id']),
+        'stop_reason': result.get('stop_reason'),
+        'iterations': result.get('iterations'),
+        'evaluations': result.get('evaluations'),
+        'evaluations_saved': result.get('evaluations_saved'),
+        'evaluations_to_target': result.get('evaluations_to_target'),
+    }
+
+@app.route('/run_pso', methods=['POST'])
+def run_pso():
+    """
+    Handle the form submission or file upload to run PSO (Particle Swarm Optimization).
+    Process inputs, configure PSO parameters, execute the optimization, and return results.
+
+    With `mode=job` the run is queued in the worker pool instead and the response only
+    contains the job id; poll `/jobs/<job_id>` for progress and the final payload.
+    """
+    try:
+        with stage('parse'):
+            run_config = parse_run_request(request.form, request.files)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Job mode: queue the run and return immediately
+    if request.form.get('mode') == 'job':
+        client_id = request.headers.get('X-Client-Id', request.remote_addr)  # Per-client fairness
         try:
-            def objective_function(variables):
-                x, y = variables
+            job_id = job_manager.submit(client_id, run_config, NUM_POINTS)
+        except JobQueueFull as e:
+            return jsonify({"error": e.message}), e.status_code, {'Retry-After': '5'}
+        status_url = url_for('job_status', job_id=job_id)
+        return jsonify(job_id=job_id, status_url=status_url), 202, {'Location': status_url}
+
+    # Run the optimization and generate output files and images
+    try:
+        result = execute_run(run_config, NUM_POINTS)
+    except RunError as e:
+        return jsonify({"error": e.message}), e.status_code
+
+    return jsonify(**artifact_urls(result))
+
+@app.route('/run_pso/stream', methods=['GET'])
+def run_pso_stream():
+    """
+    Run PSO with the parameters given in the query string and stream every iteration as
+    Server-Sent Events (`start`, `iteration`, `done`, or `error`), without rendering any images.
+    """
+    try:
+        run_config = parse_run_request(request.args, request.files)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate_events():
+        try:
+            for event, data in stream_run(run_config):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except RunError as e:
+            yield f"event: error\ndata: {json.dumps({'error': e.message, 'status_code': e.status_code})}\n\n"
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # Disable proxy buffering
+    )
+
+@app.route('/sweep', methods=['POST'])
+def sweep():
+    """
+    Run a parameter sweep: every combination of parameter sets x objectives x seeds, in parallel.
+
+    The specification is the JSON request body or an uploaded `sweep_file` (see `utils.sweep.parse_sweep`).
+    Alternatively an uploaded `param_file` lists the runs as a batch parameter file, with the runs
+    separated by `---` lines (see `utils.file_handling.iter_parameter_sets`); `plot` and `format`
+    are then form fields or query parameters.
+    One result row is streamed per run as soon as it finishes, as CSV (default) or as JSON lines
+    (`format=json` in the query string or the specification). Plots are only rendered with `"plot": true`.
+    """
+    try:
+        param_file = request.files.get('param_file')
+        if param_file:
+            spec = {'plot': request.values.get('plot', '').lower() in ('1', 'true', 'on'),
+                    'format': request.values.get('format')}
+            swept, run_configs = [], parse_batch_file(param_file, request.form)
+        else:
+            sweep_file = request.files.get('sweep_file')
+            spec = parse_sweep(sweep_file.read() if sweep_file else request.get_data())
+            swept, runs = expand_sweep(spec, sweep_runner.max_runs)
+            run_configs = []
+            for index, (labels, form) in enumerate(runs):
                 try:
-                    return eval(custom_function_code, {"x": x, "y": y, "math": math})
-                except Exception as e:
-                    return jsonify({"error": f"Error evaluating the function: {str(e)}"}), 400
-
-            if not callable(objective_function):
-                raise ValueError("Custom function is not callable.")
-        except Exception as e:
-            return jsonify({"error": f"Error defining custom function: {str(e)}"}), 400
-    elif objective_function_choice == 'custom':
-        # Handle custom function defined in the form
-        math_expr = request.form.get('math_expr')
-
-        def objective_function(variables):
-            x, y = variables
-            try:
-                return eval(math_expr, {"x": x, "y": y, "math": math})
-            except Exception as e:
-                return jsonify({"error": f"Error evaluating the function: {str(e)}"}), 400
-    elif objective_function_choice in predefined_functions:
-        # Use a predefined objective function
-        objective_function = predefined_functions[objective_function_choice]
-    else:
-        return jsonify({"error": "Invalid objective function choice."}), 400
+                    run_config = parse_run_request(form, {})
+                except ValueError as e:
+                    raise ValueError(f"Run {index} ({labels['objective']}, seed {labels['seed']}): {str(e)}") from None
+                run_configs.append((labels, run_config))
+        if any(run_config['params']['islands'] > 1 for _, run_config in run_configs):
+            raise ValueError("Island runs cannot be swept; the sweep already uses every worker.")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    plot = bool(spec.get('plot', False))
+    output_format = (request.args.get('format') or spec.get('format') or 'csv').lower()
+    if output_format not in ('csv', 'json'):
+        return jsonify({"error": "Invalid format. Choose csv or json."}), 400
+    columns = list(RESULT_COLUMNS[:3]) + swept + list(RESULT_COLUMNS[3:])
+    if plot:
+        columns += ['matplot_3d_img_url', 'matplot_animation_url', 'text_file_url']
+
+    def generate_rows():
+        if output_format == 'csv':
+            yield csv_row({column: column for column in columns}, columns)  # Header
+        for row in sweep_runner.run(run_configs, NUM_POINTS, plot):
+            if 'artifacts' in row:
+                urls = artifact_urls(row.pop('artifacts'))
+                row.update({key: urls[key] for key in ('matplot_3d_img_url', 'matplot_animation_url', 'text_file_url')})
+            if output_format == 'csv':
+                yield csv_row(row, columns)
+            else:
+                yield json.dumps({column: row.get(column) for column in columns}) + "\n"
+
+    return Response(
+        stream_with_context(generate_rows()),
+        mimetype='text/csv' if output_format == 'csv' else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # Rows are sent as runs finish
+    )
 
-    # Run the PSO algorithm
+def parse_batch_file(param_file, form):
+    """
+    Build the run configurations of a batch parameter file, reading it one run at a time.
+
+    Runs without a function block use the objective function chosen in the form.
+
+    Returns:
+        list: `(labels, run_config)` pairs, see `SweepRunner.run`.
+
+    Raises:
+        ValueError: If a run is invalid or the file has more than `sweep_runner.max_runs` runs.
+    """
+    run_configs = []
+    for index, (params, custom_function_code) in enumerate(iter_parameter_sets(param_file, DEFAULT_PARAMS)):
+        if index == sweep_runner.max_runs:
+            raise ValueError(f"The batch file has more than {sweep_runner.max_runs} runs.")
+        try:
+            run_config = build_run_config(params, params['bounds'], custom_function_code, form)
+        except ValueError as e:
+            raise ValueError(f"Run {index}: {str(e)}") from None
+        objective = 'custom' if custom_function_code else run_config['objective_function_choice']
+        run_configs.append(({'objective': objective, 'seed': params['seed']}, run_config))
+    if not run_configs:
+        raise ValueError("The batch file contains no runs.")
+    return run_configs
+
+@app.route('/export_history', methods=['POST'])
+def export_history_route():
+    """
+    Run PSO with the same inputs as /run_pso and stream the history of the swarm as a download.
+
+    The format is `format=csv` (default), `jsonl` or `npz` in the query string or the form. Every
+    iteration's positions are exported unless the form selects another `history_mode`. No plots
+    are rendered, and the response is sent in chunks while it is being formatted.
+    """
+    export_format = (request.args.get('format') or request.form.get('format') or 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format. Choose one of {', '.join(EXPORT_FORMATS)}."}), 400
+    try:
+        run_config = parse_run_request(request.form, request.files)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
-        pso = PSO(
-            objective_function,
-            bounds=params['bounds'],
-            num_particles=params['num_particles'],
-            max_iterations=params['max_iterations'],
-            is_maximization=params['is_maximization'],
-            inertia=params['inertia'],
-            cognitive=params['cognitive'],
-            social=params['social']
-        )
-        pso.optimize()  # Perform optimization
-    except Exception as e:
-        return jsonify({"error": f"Error during PSO optimization: {str(e)}"}), 500
-
-    # Generate output files and images
-    text_file_path = create_text_file(pso, math_expr, custom_function_code)
-    matplot_3d_img = create_3d_graph(pso.objective_function, pso.bounds, NUM_POINTS)
-    matplot_animated_gif = create_animation(pso, NUM_POINTS)
-
-    return jsonify(matplot_3d_img=matplot_3d_img, matplot_animated_gif=matplot_animated_gif, text_file_url=text_file_path)
+        # Full precision: exported positions must match the recorded scores, which were computed in float64
+        pso = optimize_run(run_config, history_mode=None if request.form.get('history_mode') else 'all',
+                           history_dtype=float)
+    except RunError as e:
+        return jsonify({"error": e.message}), e.status_code
+
+    def generate_chunks():
+        try:
+            yield from export_history(pso, export_format)
+        finally:
+            pso.recorder.close()  # Release the history buffer (and its spill file) once the download ends
+
+    mime_type, extension = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_with_context(generate_chunks()),
+        mimetype=mime_type,
+        headers={'Content-Disposition': f'attachment; filename=pso_history.{extension}', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report the status, progress and (once finished) the result of a queued PSO run."""
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job id."}), 404
+    if 'result' in status:
+        status['result'] = artifact_urls(status['result'])
+    return jsonify(status)
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Report hit/miss counts of the result, surface grid and compiled expression caches of this process."""
+    return jsonify(
+        result_cache=result_cache.info(),
+        surface_cache=surface_cache.info(),
+        expression_cache=compile_cache_info()._asdict()
+    )
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose request and stage durations, evaluations and peak memory in the Prometheus text format."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/artifacts/<artifact_id>', methods=['GET'])
+def get_artifact(artifact_id):
+    """Serve a generated plot, animation or text file, with ETag/conditional GET and range request support."""
+    artifact = artifact_store.get_path(artifact_id)
+    if artifact is None:
+        return jsonify({"error": "Unknown or expired artifact."}), 404
+    path, content_type = artifact
+    # The id is the content hash, so it is a strong ETag and the content never changes
+    return send_file(path, mimetype=content_type, conditional=True, etag=artifact_id.split('.')[0],
+                     max_age=artifact_store.ttl)
 
 @app.route('/download_best_particle_file', methods=['GET'])
 def download_best_particle_file():
     """Provide a downloadable file containing the best particle's position."""
-    text_file_path = request.args.get('file')  # Get file path from query parameters
-    return send_file(text_file_path, as_attachment=True)  # Send file as an attachment
+    artifact = artifact_store.get_path(request.args.get('id'))  # Get artifact id from query parameters
+    if artifact is None or artifact[1] != 'text/plain':
+        return jsonify({"error": "Unknown or expired file."}), 404
+    # Send file as an attachment
+    return send_file(artifact[0], mimetype='text/plain', as_attachment=True, conditional=True,
+                     download_name='best_particle_positions.txt')
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')  # One JSON line per request
     app.run(debug=True)  # Start Flask app in debug mode
@@ -1,78 +1,202 @@
 import numpy as np  # Library for numerical operations
-import matplotlib.pyplot as plt  # Library for plotting
-from matplotlib import animation  # Module for creating animations
-import base64  # Library for encoding data into base64 format
-import tempfile  # Module for creating temporary files
-import os  # Module for interacting with the operating system
-import matplotlib  # Library for creating static, animated, and interactive plots
-matplotlib.use('Agg')  # Use Agg backend for non-GUI rendering (suitable for servers)
+import io  # Library for in-memory file handling
+import shutil  # Locating a local video encoder
+import subprocess  # Piping frames into the video encoder
+from PIL import Image  # Frame assembly and GIF encoding
+from utils.surface_grid import surface_cache, axis_labels  # Shared, cached objective surface grids
+from utils.figures import contour_figures  # Reused, lazily created Matplotlib figures (Agg, no GUI)
 
+FRAME_DURATION_MS = 500  # Display time of one frame (2 frames per second)
+MAX_FRAMES = 200  # Longer runs are decimated to this many frames
 
+# Palette entries reserved for unchanged pixels and the markers; the contour background uses the remaining colors
+TRANSPARENT_INDEX = 253
+PARTICLE_COLOR_INDEX = 254
+BEST_COLOR_INDEX = 255
+PARTICLE_COLOR = (255, 0, 0)  # Red dots for particles
+BEST_COLOR = (0, 128, 0)  # Green 'x' for global best
 
-def create_animation(pso,NUM_POINTS):
+# Video containers that can be produced when ffmpeg is installed: format -> (ffmpeg arguments, MIME type)
+VIDEO_FORMATS = {
+    'mp4': (['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-movflags', 'frag_keyframe+empty_moov', '-f', 'mp4'], 'video/mp4'),
+    'webm': (['-c:v', 'libvpx-vp9', '-pix_fmt', 'yuv420p', '-f', 'webm'], 'video/webm'),
+}
+
+
+def _disk_offsets(radius):
+    """Pixel offsets (rows, columns) of a filled disk centered on (0, 0)."""
+    span = np.arange(-int(radius), int(radius) + 1)
+    rows, cols = np.meshgrid(span, span, indexing='ij')
+    inside = rows**2 + cols**2 <= radius**2
+    return rows[inside], cols[inside]
+
+
+def _cross_offsets(half_size, half_width):
+    """Pixel offsets (rows, columns) of an 'x' marker centered on (0, 0)."""
+    span = np.arange(-half_size, half_size + 1)
+    rows, cols = np.meshgrid(span, span, indexing='ij')
+    on_cross = (np.abs(rows - cols) <= half_width) | (np.abs(rows + cols) <= half_width)
+    return rows[on_cross], cols[on_cross]
+
+
+def select_frames(num_iterations, max_frames=MAX_FRAMES):
     """
-    Create an animated contour plot visualizing the movement of particles during PSO optimization.
+    Pick the iterations to animate, evenly spaced and always including the first and last one.
+
+    Args:
+        num_iterations (int): Number of recorded iterations.
+        max_frames (int, optional): Maximum number of frames; None keeps every iteration.
+
+    Returns:
+        np.ndarray: Sorted indices of the iterations to draw.
+    """
+    if not max_frames or num_iterations <= max_frames:
+        return np.arange(num_iterations)
+    return np.unique(np.linspace(0, num_iterations - 1, max_frames).round().astype(int))
+
+
+def _render_background(X, Y, Z, bounds, dims):
+    """
+    Rasterize the contour plot once.
+
+    Returns:
+        tuple: The RGB background (height x width x 3), the function mapping data coordinates to
+               pixel (row, column) arrays, and the pixel box (row_min, row_max, col_min, col_max) of the axes.
+    """
+    with contour_figures.borrow() as (fig, ax):  # Cleared and returned to the pool afterwards
+        ax.contourf(X, Y, Z, levels=50, cmap='plasma')  # Draw a contour plot of the objective function
+        ax.set_xlim(bounds[dims[0]][0], bounds[dims[0]][1])
+        ax.set_ylim(bounds[dims[1]][0], bounds[dims[1]][1])
+        x_label, y_label = axis_labels(bounds, dims)
+        ax.set_title('Objective Function Contour Plot')  # Set the title
+        ax.set_xlabel(x_label)  # Label the x-axis
+        ax.set_ylabel(y_label)  # Label the y-axis
+        fig.canvas.draw()
+
+        background = np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+        height = background.shape[0]
+        transform = ax.transData.frozen()  # Data -> display coordinates, with the origin at the bottom left
+        (left, bottom), (right, top) = ax.get_window_extent().get_points()  # Axes box in display coordinates
+
+    def to_pixels(points):
+        # Particles are projected onto the two plotted dimensions
+        display = transform.transform(np.asarray(points, dtype=float)[:, list(dims)])
+        return np.rint(height - display[:, 1]).astype(int), np.rint(display[:, 0]).astype(int)
+
+    box = (int(height - top), int(height - bottom), int(left), int(right))
+    return background, to_pixels, box
+
+
+def _stamp(frame, rows, cols, offsets, box, color_index):
+    """Set the pixels of a marker shape around every (row, column) center, clipped to the axes box."""
+    marker_rows = (rows[:, None] + offsets[0][None, :]).ravel()
+    marker_cols = (cols[:, None] + offsets[1][None, :]).ravel()
+    row_min, row_max, col_min, col_max = box
+    visible = (marker_rows >= row_min) & (marker_rows < row_max) & (marker_cols >= col_min) & (marker_cols < col_max)
+    frame[marker_rows[visible], marker_cols[visible]] = color_index
+
+
+def render_animation(pso, NUM_POINTS, surface=None, max_frames=MAX_FRAMES, video_format='gif', dims=(0, 1), anchor=None):
+    """
+    Render the movement of the particles over a contour plot of the objective function.
+
+    The contour background is rasterized and quantized to a palette once; each frame only
+    stamps the particle and global best markers into a copy of the palette indices, and the
+    frames are encoded straight into an in-memory buffer. Frames are taken from the iterations
+    stored by the run's history recorder; without stored positions only the global best is drawn.
 
     Args:
         pso: A PSO (Particle Swarm Optimization) instance containing optimization data and history.
+        NUM_POINTS (int): The number of points in each dimension of the contour grid.
+        surface (SurfaceGrid, optional): Precomputed grid of the objective function; computed if omitted.
+        max_frames (int, optional): Decimate longer runs to this many frames; None keeps every iteration.
+        video_format (str): 'gif', or 'mp4'/'webm' when ffmpeg is available (falls back to GIF otherwise).
+        dims (tuple): The two dimensions to plot; particles are projected onto them.
+        anchor (array-like, optional): Coordinates of the other dimensions for the contour slice.
 
     Returns:
-        A base64-encoded string of the generated animation in GIF format.
+        tuple: The encoded animation (bytes) and its MIME type.
     """
-    # Generate a grid of x and y values within the bounds
-    x_vals = np.linspace(pso.bounds[0][0], pso.bounds[0][1], NUM_POINTS)
-    y_vals = np.linspace(pso.bounds[1][0], pso.bounds[1][1], NUM_POINTS)
-    X, Y = np.meshgrid(x_vals, y_vals)  # Create a 2D grid from x and y
-    Z = np.array([
-        pso.objective_function([x, y])  # Evaluate the objective function for each grid point
-        for x, y in zip(np.ravel(X), np.ravel(Y))
-    ]).reshape(X.shape)
-
-    # Create a figure and axis for plotting
-    fig, ax = plt.subplots(figsize=(8, 6))
-    # Draw a contour plot of the objective function
-    contour = ax.contourf(X, Y, Z, levels=50, cmap='plasma')
-    ax.set_title('Objective Function Contour Plot')  # Set the title
-    ax.set_xlabel('X')  # Label the x-axis
-    ax.set_ylabel('Y')  # Label the y-axis
-
-    # Scatter plot for particles and the global best marker
-    scatter = ax.scatter([], [], color='red', s=50, label='Particles')  # Red dots for particles
-    global_best_marker = ax.scatter([], [], color='green', s=100, label='Global Best', marker='x')  # Green 'x' for global best
-
-    def update(frame):
-        """
-        Update the positions of particles and the global best for the given frame.
-        
-        Args:
-            frame: Current frame index.
-
-        Returns:
-            Updated scatter and global_best_marker artists for animation.
-        """
-        # Get particle positions for the current frame
-        particle_positions = pso.history[frame]
-        scatter.set_offsets(particle_positions)  # Update particle positions
-        # Get the global best position for the current frame
-        global_best_position = pso.best_positions_per_iteration[frame]
-        global_best_marker.set_offsets([global_best_position[:2]])  # Update global best position
-        return scatter, global_best_marker
-
-    # Create the animation
-    ani = animation.FuncAnimation(
-        fig, update, frames=len(pso.history), blit=True  # Call update for each frame
-    )
-
-    # Save the animation to a temporary GIF file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".gif") as tmpfile:
-        ani.save(tmpfile.name, writer="pillow", fps=2)  # Save animation at 2 frames per second
-        tmpfile_path = tmpfile.name  # Store the temporary file path
-
-    # Read the GIF file and encode it as a base64 string
-    with open(tmpfile_path, "rb") as f:
-        img_str = base64.b64encode(f.read()).decode('utf-8')
-
-    # Clean up by removing the temporary file
-    os.remove(tmpfile_path)
-    plt.close(fig)  # Close the plot to free resources
-    return img_str  # Return the base64-encoded string of the animation
+    if surface is None:
+        surface = surface_cache.get_surface(pso.objective_function, pso.bounds, NUM_POINTS, dims, anchor)
+    X, Y, Z = surface
+    background, to_pixels, box = _render_background(X, Y, Z, pso.bounds, dims)
+
+    # Quantize the background once and reserve two palette entries for the markers
+    palette_image = Image.fromarray(background).quantize(colors=TRANSPARENT_INDEX, method=Image.Quantize.MEDIANCUT)
+    background_indices = np.asarray(palette_image)
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    used_palette = np.array(palette_image.getpalette()[:TRANSPARENT_INDEX * 3], dtype=np.uint8).reshape(-1, 3)
+    palette[:len(used_palette)] = used_palette
+    palette[PARTICLE_COLOR_INDEX] = PARTICLE_COLOR
+    palette[BEST_COLOR_INDEX] = BEST_COLOR
+
+    # Marker shapes matching the scatter sizes of the original plot (s=50 dots, s=100 crosses at 100 dpi)
+    particle_offsets = _disk_offsets(radius=5)
+    best_offsets = _cross_offsets(half_size=7, half_width=1)
+
+    recorder = pso.recorder
+    iterations = recorder.iterations  # Iterations with stored particle positions
+    positions = recorder.positions
+    if len(iterations) == 0:
+        iterations = np.arange(recorder.num_iterations)  # History off: animate the global best only
+        positions = None
+    best_positions = recorder.best_positions
+
+    frames = []
+    for frame_index in select_frames(len(iterations), max_frames):
+        frame = background_indices.copy()
+        if positions is not None:
+            rows, cols = to_pixels(positions[frame_index])  # Particle positions for the current frame
+            _stamp(frame, rows, cols, particle_offsets, box, PARTICLE_COLOR_INDEX)
+        rows, cols = to_pixels(best_positions[iterations[frame_index]][None, :])  # Global best for the current frame
+        _stamp(frame, rows, cols, best_offsets, box, BEST_COLOR_INDEX)
+        frames.append(frame)
+    if not frames:
+        frames.append(background_indices.copy())  # No iteration ran: a single frame of the contour plot
+
+    if video_format in VIDEO_FORMATS and shutil.which('ffmpeg'):
+        return _encode_video(frames, palette, video_format)
+    return _encode_gif(frames, palette), 'image/gif'
+
+
+def _encode_gif(frames, palette):
+    """
+    Encode palette-index frames as a looping GIF in memory.
+
+    Every frame after the first only stores the pixels that changed; the rest use the transparent
+    index and show the previous frame, which compresses well without Pillow's per-frame diffing.
+
+    Raises:
+        ValueError: If there are no frames.
+    """
+    if not frames:
+        raise ValueError("An animation needs at least one frame.")
+    images = []
+    previous = None
+    for frame in frames:
+        delta = frame if previous is None else np.where(frame != previous, frame, TRANSPARENT_INDEX).astype(np.uint8)
+        previous = frame
+        image = Image.fromarray(delta, mode='P')
+        image.putpalette(palette.ravel().tolist())
+        images.append(image)
+    buf = io.BytesIO()  # Create an in-memory bytes buffer
+    images[0].save(buf, format='GIF', save_all=True, append_images=images[1:], duration=FRAME_DURATION_MS,
+                   loop=0, optimize=False, disposal=1, transparency=TRANSPARENT_INDEX)  # Keep previous frame under transparent pixels
+    return buf.getvalue()
+
+
+def _encode_video(frames, palette, video_format):
+    """Pipe RGB frames through ffmpeg and return the encoded video and its MIME type."""
+    codec_arguments, mime_type = VIDEO_FORMATS[video_format]
+    height, width = frames[0].shape
+    command = [
+        'ffmpeg', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+        '-s', f'{width}x{height}', '-r', str(1000 / FRAME_DURATION_MS), '-i', 'pipe:0',
+        *codec_arguments, 'pipe:1'
+    ]
+    raw_frames = b''.join(palette[frame].tobytes() for frame in frames)  # Palette lookup back to RGB
+    result = subprocess.run(command, input=raw_frames, capture_output=True, check=False)
+    if result.returncode != 0 or not result.stdout:
+        return _encode_gif(frames, palette), 'image/gif'  # Encoder missing the codec: fall back to GIF
+    return result.stdout, mime_type
@@ -0,0 +1,129 @@
+import hashlib  # Content-addressed artifact ids
+import os  # File system access
+import re  # Validation of artifact ids
+import tempfile  # Default storage location
+import threading  # Lock protecting the cleanup timer
+import time  # Expiry of artifacts
+
+# Artifact file extensions and the MIME types they are served with
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'mp4': 'video/mp4',
+    'webm': 'video/webm',
+    'txt': 'text/plain',
+    'npz': 'application/octet-stream',
+}
+EXTENSIONS = {content_type: extension for extension, content_type in CONTENT_TYPES.items()}
+
+# Artifact ids are the SHA-256 of the content plus the file extension, e.g. "3f2a...9c.png"
+ARTIFACT_ID_PATTERN = re.compile(r'^[0-9a-f]{64}\.(' + '|'.join(CONTENT_TYPES) + r')$')
+
+
+class ArtifactStore:
+    """
+    Directory of generated files (plots, animations, result text) served by URL.
+
+    Artifacts are content-addressed, so storing the same bytes twice is free and the id doubles
+    as an ETag. Artifacts expire `ttl` seconds after they were last stored, and the oldest ones
+    are removed first when the directory grows beyond `max_bytes`. The directory can be shared
+    by several processes.
+    """
+
+    def __init__(self, directory=None, ttl=3600, max_bytes=1024 * 1024 * 1024, cleanup_interval=60):
+        """
+        Args:
+            directory (str, optional): Storage directory; defaults to "pso_artifacts" in the temp directory.
+            ttl (int): Seconds an artifact is kept after it was last stored.
+            max_bytes (int): Size quota of the directory.
+            cleanup_interval (int): Minimum number of seconds between two cleanups.
+        """
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'pso_artifacts')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def put(self, data, content_type):
+        """
+        Store bytes and return their artifact id.
+
+        Args:
+            data (bytes): The content of the artifact.
+            content_type (str): Its MIME type; must be one of CONTENT_TYPES.
+
+        Returns:
+            str: The artifact id.
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        artifact_id = f"{hashlib.sha256(data).hexdigest()}.{EXTENSIONS[content_type]}"
+        path = os.path.join(self.directory, artifact_id)
+        if os.path.exists(path):
+            os.utime(path)  # Same content stored again: restart its time to live
+        else:
+            temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary_path, 'wb') as f:
+                f.write(data)
+            os.replace(temporary_path, path)  # Atomic, so readers never see a partial file
+        self._maybe_cleanup()
+        return artifact_id
+
+    def get_path(self, artifact_id):
+        """
+        Return the file path and MIME type of an artifact.
+
+        Returns:
+            tuple or None: `(path, content_type)`, or None if the id is invalid, unknown or expired.
+        """
+        if not artifact_id or not ARTIFACT_ID_PATTERN.match(artifact_id):
+            return None  # Rejects anything that is not a plain artifact id, e.g. "../" paths
+        path = os.path.join(self.directory, artifact_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+        except OSError:
+            return None
+        return path, CONTENT_TYPES[artifact_id.rsplit('.', 1)[1]]
+
+    def exists(self, artifact_id):
+        """Return whether an artifact can still be served."""
+        return self.get_path(artifact_id) is not None
+
+    def _maybe_cleanup(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = now
+        self.cleanup()
+
+    def cleanup(self):
+        """Remove expired artifacts, then the oldest ones until the directory fits its quota."""
+        now = time.time()
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed by another process
+            if now - stat.st_mtime > self.ttl:
+                self._remove(path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
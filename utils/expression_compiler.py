@@ -0,0 +1,209 @@
+import ast  # Python abstract syntax trees, used to validate expressions before compiling them
+import functools  # LRU cache for compiled expressions
+from types import SimpleNamespace  # Lightweight namespace standing in for the `math` module
+import numpy as np  # Library for numerical operations
+
+# Vectorized replacements for the functions and constants of the `math` module
+MATH_FUNCTIONS = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan, 'atan2': np.arctan2,
+    'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'asinh': np.arcsinh, 'acosh': np.arccosh, 'atanh': np.arctanh,
+    'exp': np.exp, 'expm1': np.expm1, 'log': np.log, 'log2': np.log2, 'log10': np.log10, 'log1p': np.log1p,
+    'sqrt': np.sqrt, 'pow': np.power, 'hypot': np.hypot,
+    'fabs': np.abs, 'floor': np.floor, 'ceil': np.ceil, 'trunc': np.trunc,
+    'degrees': np.degrees, 'radians': np.radians,
+}
+MATH_CONSTANTS = {'pi': np.pi, 'e': np.e, 'tau': 2 * np.pi}
+
+# NumPy functions that may be used directly as `np.<name>` or `numpy.<name>`
+NUMPY_FUNCTIONS = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'arcsin': np.arcsin, 'arccos': np.arccos, 'arctan': np.arctan, 'arctan2': np.arctan2,
+    'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'exp': np.exp, 'expm1': np.expm1, 'log': np.log, 'log2': np.log2, 'log10': np.log10, 'log1p': np.log1p,
+    'sqrt': np.sqrt, 'square': np.square, 'power': np.power, 'hypot': np.hypot,
+    'abs': np.abs, 'absolute': np.abs, 'sign': np.sign, 'floor': np.floor, 'ceil': np.ceil,
+    'maximum': np.maximum, 'minimum': np.minimum,
+}
+
+VARIABLE_NAMES = {'x', 'y', 'n'}  # Coordinates (and the number of dimensions) the expression may refer to
+REDUCTIONS = {'sum': np.sum, 'mean': np.mean, 'prod': np.prod}  # Reductions over the dimensions of x
+MODULE_NAMESPACES = {
+    'math': SimpleNamespace(**MATH_FUNCTIONS, **MATH_CONSTANTS),
+    'np': SimpleNamespace(**NUMPY_FUNCTIONS, **MATH_CONSTANTS),
+    'numpy': SimpleNamespace(**NUMPY_FUNCTIONS, **MATH_CONSTANTS),
+}
+BARE_NAMES = {**MATH_FUNCTIONS, **MATH_CONSTANTS, 'abs': np.abs}  # Names usable without a module prefix
+
+# Syntax allowed in an expression; anything else (attribute access on other objects, lambdas,
+# comprehensions, strings, ...) is rejected before compiling. Subscripts are only allowed on x.
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Attribute, ast.Constant, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+)
+
+
+class ExpressionError(ValueError):
+    """Raised when a custom objective expression is rejected, fails to compile, or fails to evaluate."""
+
+
+class _ExpressionValidator(ast.NodeTransformer):
+    """
+    Checks an expression tree against the allow-list and turns integer literals into floats.
+
+    Also records whether the expression is written over the coordinate vector (`x[i]`, `n`,
+    `sum(...)`) or over the two coordinates `x` and `y`.
+    """
+
+    def __init__(self):
+        self.uses_vector = False
+        self.uses_y = False
+
+    def generic_visit(self, node):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ExpressionError(f"Unsupported syntax in function: {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        # Only numbers are allowed; integers become floats so `2**10**10` overflows instead of hanging
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"Unsupported constant in function: {node.value!r}")
+        return ast.copy_location(ast.Constant(float(node.value)), node)
+
+    def visit_Name(self, node):
+        if node.id not in VARIABLE_NAMES and node.id not in BARE_NAMES and node.id not in REDUCTIONS:
+            raise ExpressionError(f"Unknown name in function: {node.id}")
+        if node.id == 'n':
+            self.uses_vector = True
+        elif node.id == 'y':
+            self.uses_y = True
+        return node
+
+    def visit_Subscript(self, node):
+        # Only `x[i]` and `x[start:stop:step]` with integer constants
+        if not isinstance(node.value, ast.Name) or node.value.id != 'x':
+            raise ExpressionError("Only x can be indexed, e.g. x[0].")
+        index = node.slice
+        parts = [index.lower, index.upper, index.step] if isinstance(index, ast.Slice) else [index]
+        for part in parts:
+            if part is None:
+                continue
+            if isinstance(part, ast.UnaryOp) and isinstance(part.op, ast.USub):
+                part = part.operand  # Negative index
+            if not isinstance(part, ast.Constant) or isinstance(part.value, bool) or not isinstance(part.value, int):
+                raise ExpressionError("Indices of x must be integer constants.")
+        self.uses_vector = True
+        return node  # The integer indices are kept as they are
+
+    def visit_Attribute(self, node):
+        # Only `math.<name>`, `np.<name>` and `numpy.<name>` with allow-listed names
+        if not isinstance(node.value, ast.Name) or node.value.id not in MODULE_NAMESPACES:
+            raise ExpressionError("Attribute access is only allowed on math, np and numpy.")
+        if not hasattr(MODULE_NAMESPACES[node.value.id], node.attr):
+            raise ExpressionError(f"Unsupported function: {node.value.id}.{node.attr}")
+        return node
+
+    def visit_Call(self, node):
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not supported in functions.")
+        if isinstance(node.func, ast.Name) and node.func.id in VARIABLE_NAMES:
+            raise ExpressionError(f"'{node.func.id}' is not callable.")
+        if isinstance(node.func, ast.Name) and node.func.id in REDUCTIONS:
+            if len(node.args) != 1:
+                raise ExpressionError(f"{node.func.id}() takes exactly one argument.")
+            self.uses_vector = True
+        return self.generic_visit(node)
+
+
+def normalize_expression(source):
+    """
+    Normalize the text of an expression so equivalent submissions share a cache entry.
+
+    Args:
+        source (str): The expression as typed in the form or uploaded in a `function:` block.
+
+    Returns:
+        str: The expression with surrounding whitespace removed and inner whitespace collapsed.
+    """
+    return " ".join(source.split())
+
+
+def compile_expression(source):
+    """
+    Compile a custom objective expression into a vectorized batch objective function.
+
+    The expression is parsed once, validated against an allow-list of names and syntax, and
+    compiled to evaluate on NumPy arrays. Compiled functions are kept in an LRU cache keyed by
+    the normalized expression text.
+
+    Expressions are written either over the two coordinates `x` and `y`, e.g. "math.sin(x) + y**2",
+    or over the coordinate vector of any dimension: `x[i]` (and slices such as `x[1:]`) select
+    coordinates, `n` is the number of dimensions and `sum(...)`, `mean(...)` and `prod(...)` reduce
+    over the dimensions, e.g. "10*n + sum(x**2 - 10*np.cos(2*np.pi*x))".
+
+    Args:
+        source (str): The expression.
+
+    Returns:
+        callable: A batch objective taking an (N, D) array and returning N scores.
+
+    Raises:
+        ExpressionError: If the expression is empty, invalid, or uses anything outside the allow-list.
+    """
+    if not source or not source.strip():
+        raise ExpressionError("Custom function is empty.")
+    return _compile_normalized(normalize_expression(source))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_normalized(expression):
+    """Parse, validate and compile a normalized expression (cached)."""
+    try:
+        tree = ast.parse(expression, mode='eval')
+        validator = _ExpressionValidator()
+        tree = ast.fix_missing_locations(validator.visit(tree))
+        code = compile(tree, '<objective>', 'eval')
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid function syntax: {e.msg}") from None
+    except (RecursionError, MemoryError):
+        raise ExpressionError("The function is nested too deeply.") from None
+    if validator.uses_vector and validator.uses_y:
+        raise ExpressionError("Use x[1] instead of y when the function indexes x or uses n or sum().")
+    uses_vector = validator.uses_vector
+    global_namespace = {'__builtins__': {}, **MODULE_NAMESPACES, **BARE_NAMES}
+
+    def objective_function(variables):
+        points = np.asarray(variables, dtype=float)
+        if uses_vector:
+            # x holds one row per dimension, so x[i] is the i-th coordinate of every point
+            x = np.moveaxis(points, -1, 0)
+
+            def reduction(function):
+                # Reduce over the dimensions only for arrays that still have that axis
+                return lambda values: function(values, axis=0) if np.ndim(values) == x.ndim else values
+
+            local_namespace = {
+                'x': x, 'n': float(points.shape[-1]),
+                **{name: reduction(function) for name, function in REDUCTIONS.items()}
+            }
+        elif validator.uses_y and points.shape[-1] < 2:
+            raise ExpressionError("The function uses y but the problem has only one dimension.")
+        else:
+            local_namespace = {'x': points[..., 0], 'y': points[..., 1] if points.shape[-1] > 1 else None}
+        try:
+            # Turn floating point problems (log of a negative number, overflow, ...) into errors,
+            # matching what the `math` functions did for a single point
+            with np.errstate(divide='raise', over='raise', invalid='raise'):
+                scores = eval(code, global_namespace, local_namespace)
+        except (ArithmeticError, IndexError, TypeError, ValueError) as e:
+            raise ExpressionError(f"Error evaluating the function: {e}") from None
+        return np.broadcast_to(np.asarray(scores, dtype=float), points.shape[:-1])
+
+    objective_function.is_batch = True  # Batch calling convention, see utils.objective_functions
+    objective_function.expression = expression
+    return objective_function
+
+
+# Hit/miss statistics of the compiled expression cache
+compile_cache_info = _compile_normalized.cache_info
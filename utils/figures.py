@@ -0,0 +1,89 @@
+import contextlib  # Borrowing a figure
+import queue  # Idle figures
+import numpy as np  # Library for numerical operations
+
+MAX_IDLE_FIGURES = 4  # Idle figures kept per layout, about 2 MB each
+FIGURE_SIZE = (8, 6)  # Inches, at Matplotlib's default 100 dpi
+
+def _load_matplotlib():
+    """Import the Matplotlib classes used by the renderers; only the first call loads Matplotlib."""
+    from matplotlib.figure import Figure  # The rendering stack is only loaded when needed
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # Non-GUI raster canvas
+    return Figure, FigureCanvasAgg
+
+
+class FigurePool:
+    """
+    Reusable Matplotlib figures of one layout, shared by the threads of a process.
+
+    Matplotlib is only imported when the first figure is created, so processes that never render
+    (optimization-only and JSON-only requests) do not load it. Figures are created with the Agg
+    canvas instead of through pyplot, so they are not tracked by pyplot's global figure manager:
+    a rendered figure keeps its axes, canvas and renderer for the next render instead of being
+    closed. Only the plotted data is removed; titles, labels and limits are left for the next render
+    to set, which is several times cheaper than clearing the axes or creating a new figure.
+    """
+
+    def __init__(self, projection=None, max_idle=MAX_IDLE_FIGURES):
+        """
+        Args:
+            projection (str, optional): Projection of the single axes, e.g. '3d'.
+            max_idle (int): Figures kept for reuse; more are created when renders overlap.
+        """
+        self.projection = projection
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()  # The most recently used figure is the warmest
+        self.created = 0
+
+    def _create(self):
+        Figure, FigureCanvasAgg = _load_matplotlib()
+        fig = Figure(figsize=FIGURE_SIZE)
+        FigureCanvasAgg(fig)  # Attaches itself as fig.canvas
+        ax = fig.add_subplot(111, projection=self.projection)
+        self.created += 1
+        return fig, ax
+
+    @contextlib.contextmanager
+    def borrow(self):
+        """
+        Lend a figure and its axes to one render.
+
+        The render must set every title, label and limit it relies on. The plotted data is removed
+        when the figure is returned; figures beyond `max_idle` are dropped.
+
+        Yields:
+            tuple: The Figure and its Axes.
+        """
+        try:
+            fig, ax = self._idle.get_nowait()
+        except queue.Empty:
+            fig, ax = self._create()
+        try:
+            yield fig, ax
+        finally:
+            for artists in (ax.collections, ax.lines, ax.patches, ax.images, ax.texts):
+                for artist in list(artists):
+                    artist.remove()
+            if self._idle.qsize() < self.max_idle:
+                self._idle.put((fig, ax))
+
+
+surface_figures = FigurePool(projection='3d')  # 3-D surface plots
+contour_figures = FigurePool()  # Animation backgrounds
+
+
+def prewarm():
+    """
+    Load Matplotlib and draw one small surface and contour plot, so the first real render does not
+    pay for the imports, the font cache and the colormap lookups. The figures stay in the pools.
+    """
+    X, Y = np.meshgrid(np.linspace(-1, 1, 5), np.linspace(-1, 1, 5))
+    Z = X**2 + Y**2
+    with surface_figures.borrow() as (fig, ax):
+        ax.plot_surface(X, Y, Z, cmap='plasma')
+        ax.set_title('Objective Function Surface')
+        fig.canvas.draw()
+    with contour_figures.borrow() as (fig, ax):
+        ax.contourf(X, Y, Z, levels=50, cmap='plasma')
+        ax.set_title('Objective Function Contour Plot')
+        fig.canvas.draw()
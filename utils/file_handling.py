@@ -1,9 +1,97 @@
-import tempfile  # Module for creating temporary files
+RUN_SEPARATOR = '---'  # Line separating the runs of a batch parameter file
+
+# Conversion of the values of a parameter file, by key
+INTEGER_KEYS = ('num_particles', 'max_iterations', 'max_frames', 'dimensions', 'islands', 'migration_interval',
+                'neighborhood_size')
+FLOAT_KEYS = ('inertia', 'cognitive', 'social', 'tolerance')
+OPTIONAL_INTEGER_KEYS = ('patience', 'history_every', 'history_capacity', 'seed')
+OPTIONAL_FLOAT_KEYS = ('target_score', 'min_diameter', 'time_budget', 'max_velocity', 'final_inertia')
+BOOLEAN_KEYS = ('is_maximization', 'constriction')  # true or false
+CHOICE_KEYS = ('animation_format', 'slice_anchor', 'plot_quality', 'history_mode', 'topology')  # Lowercase strings
+
+
+def _convert_value(key, value):
+    """Convert the text of a parameter file value to the type of its key."""
+    if key in INTEGER_KEYS:
+        return int(value)
+    if key in FLOAT_KEYS:
+        return float(value)
+    if key in OPTIONAL_INTEGER_KEYS:
+        return int(value) if value else None
+    if key in OPTIONAL_FLOAT_KEYS:
+        return float(value) if value else None
+    if key in BOOLEAN_KEYS:
+        return value.lower() == 'true'
+    if key in CHOICE_KEYS:
+        return value.lower()
+    return value
+
+
+def iter_parameter_sets(param_file, params):
+    """
+    Parse a parameter file line by line and yield the parameters of every run it contains.
+
+    A file holds `key: value` lines and optionally a `function:` line followed by the custom
+    function. Batch files hold several runs separated by `---` lines; every run starts from the
+    given defaults. Blank lines and lines starting with # outside a function are ignored. The
+    file is read incrementally, so runs are yielded before the rest of the file is read.
+
+    Args:
+        param_file: The uploaded parameter file (any iterable of bytes or str lines).
+        params (dict): Default parameters; not modified.
+
+    Yields:
+        tuple: The parameters of a run and its custom function code (None without a function block).
+
+    Raises:
+        ValueError: If a line cannot be parsed; the message names the run and line.
+    """
+    run_params, function_lines, in_function, has_content = dict(params), [], False, False
+    run_number = 1
+    for line_number, line in enumerate(param_file, 1):
+        if isinstance(line, bytes):
+            try:
+                line = line.decode('utf-8')
+            except UnicodeDecodeError:
+                raise ValueError(f"Failed to parse the parameter file: line {line_number} is not valid UTF-8.") from None
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+
+        if stripped == RUN_SEPARATOR:
+            if has_content:
+                yield run_params, "\n".join(function_lines) if function_lines else None
+                run_number += 1
+            run_params, function_lines, in_function, has_content = dict(params), [], False, False
+            continue
+        if in_function:
+            function_lines.append(line)  # Append lines to the function block
+            continue
+        if not stripped or stripped.startswith('#'):
+            continue
+        has_content = True
+        # Start collecting function lines when 'function:' block is encountered
+        if stripped.lower() == 'function:':
+            in_function = True
+            continue
+
+        # Split key-value pairs and clean them
+        key, separator, value = line.partition(':')
+        key, value = key.strip().lower(), value.strip()
+        try:
+            if not separator:
+                raise ValueError("expected 'key: value'")
+            if key in params:  # Unknown keys are ignored
+                run_params[key] = _convert_value(key, value)
+        except ValueError as e:
+            raise ValueError(f"Failed to parse the parameter file: run {run_number}, line {line_number}: {str(e)}") from None
+
+    if has_content:
+        yield run_params, "\n".join(function_lines) if function_lines else None
 
 
 def parse_file(param_file, params):
     """
-    Parse a parameter file and update parameters and custom function code.
+    Parse a parameter file with a single run and update parameters and custom function code.
 
     Args:
         param_file: The uploaded parameter file 
@@ -11,53 +99,23 @@ def parse_file(param_file, params):
 
     Returns:
         tuple: Updated parameters dictionary and custom function code as a string.
+
+    Raises:
+        ValueError: If the file cannot be parsed or contains several runs.
     """
-    custom_function_code = None  # Initialize custom function code as None
-    try:
-        # Read the file and decode to UTF-8, then split into lines
-        lines = param_file.read().decode('utf-8').splitlines()
-        function_block = False  # Flag to indicate if reading a function block
-        function_code_lines = []  # List to store lines of the function code
-
-        for line in lines:
-            # Start collecting function lines when 'function:' block is encountered
-            if line.strip().lower() == 'function:':
-                function_block = True
-                continue
-
-            if function_block:
-                # Append lines to the function block
-                function_code_lines.append(line)
-            else:
-                # Split key-value pairs and clean them
-                key, value = line.split(":")
-                key = key.strip().lower()
-                value = value.strip()
-
-                # Update the parameter dictionary based on keys
-                if key in params:
-                    if key == 'bounds':  # Handle bounds as string
-                        params[key] = value
-                    elif key in ['num_particles', 'max_iterations']:  # Convert integers
-                        params[key] = int(value)
-                    elif key in ['inertia', 'cognitive', 'social']:  # Convert floats
-                        params[key] = float(value)
-                    elif key == 'is_maximization':  # Handle boolean values
-                        params[key] = value.lower() == 'true'
-
-        if function_code_lines:
-            # Combine all function lines into a single string
-            custom_function_code = "\n".join(function_code_lines)
-
-    except Exception as e:
-        # Raise an error if parsing fails
-        raise ValueError(f"Failed to parse the parameter file: {str(e)}")
-    
-    return params, custom_function_code  # Return updated parameters and custom function code
-
-def create_text_file(pso, math_expr=None, custom_function_code=None):
+    runs = iter_parameter_sets(param_file, params)
+    run = next(runs, None)
+    if run is None:
+        return params, None  # Nothing to override
+    if next(runs, None) is not None:
+        raise ValueError(f"The parameter file contains several runs separated by {RUN_SEPARATOR}; "
+                         "submit batch files to /sweep.")
+    params.update(run[0])
+    return params, run[1]
+
+def format_results_text(pso, math_expr=None, custom_function_code=None):
     """
-    Create a text file with simulation parameters and best positions for each iteration.
+    Format the simulation parameters and best positions for each iteration as text.
 
     Args:
         pso: A PSO (Particle Swarm Optimization) instance containing simulation data.
@@ -65,35 +123,47 @@ def create_text_file(pso, math_expr=None, custom_function_code=None):
         custom_function_code (str, optional): Custom Python code defining the objective function.
 
     Returns:
-        str: Path to the created text file.
+        str: The contents of the best particle positions file.
     """
-    # Create a temporary text file
-    text_file = tempfile.NamedTemporaryFile(delete=False, suffix=".txt")
-    with open(text_file.name, 'w') as f:
-        # Write simulation parameters
-        f.write("Simulation Parameters:\n")
-        f.write(f"Inertia: {pso.inertia}\n")
-        f.write(f"Cognitive Coefficient: {pso.cognitive}\n")
-        f.write(f"Social Coefficient: {pso.social}\n")
-        f.write(f"Bounds: {pso.bounds}\n")
-        f.write(f"Number of Particles: {pso.num_particles}\n")
-        f.write(f"Max Iterations: {pso.max_iterations}\n")
-        
-        # Write the objective function definition
-        if math_expr:
-            f.write(f"Objective Function (math format): {math_expr}\n")
-        elif custom_function_code:
-            f.write(f"Objective Function (Custom Python code):\n{custom_function_code}\n")
-        else:
-            f.write(f"Objective Function: {str(pso.objective_function)}\n")
-        
-        # Write the optimization goal
-        f.write(f"Optimization Goal: {'Maximization' if pso.is_maximization else 'Minimization'}\n\n")
-        
-        # Write the best particle positions per iteration
-        f.write("Best Particle Positions per Iteration:\n")
-        for i, best_position in enumerate(pso.best_positions_per_iteration):
-            f.write(f"Iteration {i + 1}: {best_position}\n")
-    
-    # Return the file path
-    return text_file.name
+    lines = []
+    # Write simulation parameters
+    lines.append("Simulation Parameters:")
+    lines.append(f"Inertia: {pso.inertia}")
+    lines.append(f"Cognitive Coefficient: {pso.cognitive}")
+    lines.append(f"Social Coefficient: {pso.social}")
+    if pso.final_inertia is not None:
+        lines.append(f"Final Inertia: {pso.final_inertia}")
+    if pso.constriction_factor is not None:
+        lines.append(f"Constriction Factor: {pso.constriction_factor:.6f}")
+    if pso.max_velocity is not None:
+        lines.append(f"Max Velocity: {pso.max_velocity}")
+    lines.append(f"Topology: {pso.topology}" + (f" ({pso.neighborhood_size} informants)" if pso.topology == 'random' else ""))
+    lines.append(f"Bounds: {pso.bounds}")
+    lines.append(f"Number of Particles: {pso.num_particles}")
+    lines.append(f"Max Iterations: {pso.max_iterations}")
+    if pso.seed is not None:
+        lines.append(f"Seed: {pso.seed}")
+
+    # Write the objective function definition
+    if math_expr:
+        lines.append(f"Objective Function (math format): {math_expr}")
+    elif custom_function_code:
+        lines.append(f"Objective Function (Custom Python code):\n{custom_function_code}")
+    else:
+        lines.append(f"Objective Function: {getattr(pso.objective_function, '__name__', str(pso.objective_function))}")
+
+    # Write the optimization goal
+    lines.append(f"Optimization Goal: {'Maximization' if pso.is_maximization else 'Minimization'}\n")
+
+    # Write why the optimization stopped
+    if pso.stop_reason and pso.stop_reason != 'max_iterations':
+        lines.append(f"Stopped Early: {pso.stop_reason} after {pso.iterations_run} iterations "
+                     f"({pso.evaluations_saved} evaluations saved)\n")
+    if pso.evaluations_to_target is not None:
+        lines.append(f"Evaluations to Target: {pso.evaluations_to_target}\n")
+
+    # Write the best particle positions per iteration
+    lines.append("Best Particle Positions per Iteration:")
+    for i, best_position in enumerate(pso.recorder.best_positions):
+        lines.append(f"Iteration {i + 1}: {best_position}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,152 @@
+import io  # In-memory chunk buffers
+import json  # JSON lines
+import zipfile  # NPZ archives
+import numpy as np  # Library for numerical operations
+from numpy.lib import format as npy_format  # .npy headers of the archive entries
+
+# Export formats: format -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'npz': ('application/octet-stream', 'npz'),
+}
+CHUNK_BYTES = 64 * 1024  # Size of the chunks handed to the response
+
+
+def export_history(pso, export_format):
+    """
+    Stream the recorded history of an optimized swarm as CSV, JSON lines or an NPZ archive.
+
+    The export holds the global best position and score of every iteration and, for the
+    iterations whose positions were recorded (see `HistoryRecorder`), the position and score of
+    every particle. Particle scores were recorded during the run, so exporting does not evaluate the
+    objective function. Nothing is written to disk and only one frame is formatted at a time.
+
+    - csv: `iteration,particle,score,x0,...` rows; the global best of an iteration is the row with particle `best`.
+    - jsonl: a first line describing the run, then one object per iteration.
+    - npz: the arrays `iterations`, `positions`, `scores`, `best_positions`, `best_scores` and `bounds`.
+
+    Args:
+        pso: An optimized PSO instance.
+        export_format (str): One of EXPORT_FORMATS.
+
+    Yields:
+        bytes: Chunks of about CHUNK_BYTES.
+    """
+    writer = {'csv': _csv_parts, 'jsonl': _jsonl_parts, 'npz': _npz_parts}[export_format]
+    buffer = io.BytesIO()
+    for part in writer(pso):
+        buffer.write(part.encode('utf-8') if isinstance(part, str) else part)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer = io.BytesIO()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _frames(pso):
+    """Yield the iteration (0-based), positions and particle scores of every recorded iteration."""
+    recorder = pso.recorder
+    for iteration, positions, scores in zip(recorder.iterations, recorder.positions, recorder.scores):
+        yield int(iteration), np.asarray(positions, dtype=float), scores
+
+
+def _csv_parts(pso):
+    num_dimensions = len(pso.bounds)
+    yield 'iteration,particle,score,' + ','.join(f"x{dim}" for dim in range(num_dimensions)) + '\n'
+    best_positions, best_scores = pso.recorder.best_positions, pso.recorder.best_scores
+    frames = _frames(pso)
+    frame = next(frames, None)
+    particles = np.arange(pso.num_particles)
+    for iteration in range(len(best_scores)):
+        best = ','.join(repr(float(value)) for value in best_positions[iteration])
+        yield f"{iteration + 1},best,{float(best_scores[iteration])!r},{best}\n"
+        if frame is not None and frame[0] == iteration:
+            _, positions, scores = frame
+            buffer = io.StringIO()
+            rows = np.column_stack([np.full(len(particles), iteration + 1), particles, scores, positions])
+            np.savetxt(buffer, rows, delimiter=',', fmt=['%d', '%d'] + ['%.17g'] * (num_dimensions + 1))
+            yield buffer.getvalue()
+            frame = next(frames, None)
+
+
+def _jsonl_parts(pso):
+    recorder = pso.recorder
+    yield json.dumps({
+        'bounds': [list(bound) for bound in pso.bounds], 'num_particles': pso.num_particles,
+        'num_dimensions': len(pso.bounds), 'is_maximization': pso.is_maximization,
+        'iterations': recorder.num_iterations, 'recorded_iterations': len(recorder.iterations),
+        'stop_reason': pso.stop_reason, 'evaluations': pso.evaluations,
+    }) + '\n'
+    frames = _frames(pso)
+    frame = next(frames, None)
+    for iteration in range(recorder.num_iterations):
+        record = {
+            'iteration': iteration + 1,
+            'global_best_score': float(recorder.best_scores[iteration]),
+            'global_best_position': recorder.best_positions[iteration].tolist(),
+        }
+        if frame is not None and frame[0] == iteration:
+            record['positions'] = frame[1].tolist()
+            record['scores'] = frame[2].tolist()
+            frame = next(frames, None)
+        yield json.dumps(record) + '\n'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file collecting what the zip writer produces until it is drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _npy_header(entry, dtype, shape):
+    header = {'descr': npy_format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': tuple(shape)}
+    npy_format.write_array_header_1_0(entry, header)
+
+
+def _npz_parts(pso):
+    """
+    Write the NPZ archive entry by entry; the positions are written one frame at a time.
+
+    The sink is not seekable, so the zip file uses data descriptors after every entry, which
+    np.load reads like any other archive.
+    """
+    recorder = pso.recorder
+    sink = _ChunkSink()
+    iterations = recorder.iterations
+    num_frames = len(iterations)
+    shape = (num_frames, pso.num_particles, len(pso.bounds))
+    scores = np.empty((num_frames, pso.num_particles))
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        with archive.open('positions.npy', mode='w', force_zip64=True) as entry:
+            _npy_header(entry, float, shape)
+            for index, (_, positions, frame_scores) in enumerate(_frames(pso)):
+                entry.write(np.ascontiguousarray(positions, dtype=float).tobytes())
+                scores[index] = frame_scores
+                yield sink.drain()
+        arrays = {
+            'iterations': iterations + 1,  # 1-based, like the other exports
+            'scores': scores,
+            'best_positions': recorder.best_positions,
+            'best_scores': recorder.best_scores,
+            'bounds': np.asarray(pso.bounds, dtype=float),
+        }
+        for name, array in arrays.items():
+            with archive.open(f'{name}.npy', mode='w', force_zip64=True) as entry:
+                npy_format.write_array(entry, np.ascontiguousarray(array), allow_pickle=False)
+            yield sink.drain()
+    yield sink.drain()  # Central directory
@@ -1,54 +1,44 @@
-import numpy as np  # Library for numerical computations
-import matplotlib.pyplot as plt  # Library for creating visualizations
 import io  # Library for in-memory file handling
-import base64  # Library for encoding data into base64 format
-import matplotlib  # Library for creating static, animated, and interactive plots
-matplotlib.use('Agg')  # Use Agg backend for non-GUI rendering (suitable for server environments)
+from utils.surface_grid import surface_cache, axis_labels  # Shared, cached objective surface grids
+from utils.figures import surface_figures  # Reused, lazily created Matplotlib figures (Agg, no GUI)
 
-def create_3d_graph(objective_function, bounds, NUM_POINTS):
+def render_3d_graph(objective_function, bounds, NUM_POINTS, surface=None, dims=(0, 1), anchor=None, full_resolution=False):
     """
     Generate a 3D surface plot of the objective function within specified bounds.
 
     Args:
         objective_function (callable): The function to be plotted.
-        bounds (list of tuples): The bounds of the search space [(x_min, x_max), (y_min, y_max)].
+        bounds (list of tuples): The bounds of every dimension of the search space.
         NUM_POINTS (int): The number of points to generate in each dimension for the plot.
+        surface (SurfaceGrid, optional): Precomputed grid of the objective function; computed if omitted.
+        dims (tuple): The two dimensions to plot; the others are held at `anchor` (see `surface_grid.compute_surface`).
+        anchor (array-like, optional): Coordinates of the dimensions that are not plotted.
+        full_resolution (bool): Draw every row and column of the grid instead of Matplotlib's default
+                                subsampling to 50 x 50; for adaptive grids, which are already capped in
+                                size and whose refined rows would be skipped by evenly strided subsampling.
 
     Returns:
-        str: A base64-encoded string representing the 3D plot in PNG format.
+        bytes: The 3D plot in PNG format.
     """
-    # Generate a grid of x and y values within the specified bounds
-    x_vals = np.linspace(bounds[0][0], bounds[0][1], NUM_POINTS)  # x range
-    y_vals = np.linspace(bounds[1][0], bounds[1][1], NUM_POINTS)  # y range
-    X, Y = np.meshgrid(x_vals, y_vals)  # Create a 2D grid from x and y
-
-    # Evaluate the objective function at each grid point
-    Z = np.array([
-        objective_function([x, y])  # Calculate function value at (x, y)
-        for x, y in zip(np.ravel(X), np.ravel(Y))
-    ]).reshape(X.shape)
-
-    # Create a figure and 3D axis for plotting
-    fig = plt.figure(figsize=(8, 6))  # Define figure size
-    ax = fig.add_subplot(111, projection='3d')  # Add a 3D subplot
-
-    # Plot the surface of the objective function
-    ax.plot_surface(X, Y, Z, cmap='plasma', alpha=0.6)  # Use 'plasma' colormap with transparency
-    ax.set_xlabel('X')  # Label for the x-axis
-    ax.set_ylabel('Y')  # Label for the y-axis
-    ax.set_zlabel('Objective Value')  # Label for the z-axis
-    ax.set_title('Objective Function Surface')  # Title of the plot
-
-    # Save the plot to a buffer in PNG format
-    buf = io.BytesIO()  # Create an in-memory bytes buffer
-    plt.savefig(buf, format="png")  # Save the plot to the buffer
-    buf.seek(0)  # Reset buffer position to the beginning
-
-    # Convert the image to a base64-encoded string
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-
-    # Close the plot to release resources
-    plt.close(fig)
-
-    # Return the base64-encoded string
-    return img_str
+    # Evaluate the objective function over a grid within the specified bounds
+    if surface is None:
+        surface = surface_cache.get_surface(objective_function, bounds, NUM_POINTS, dims, anchor)
+    X, Y, Z = surface
+    x_label, y_label = axis_labels(bounds, dims)
+
+    # Borrow a 3D figure; it is cleared and returned to the pool afterwards
+    with surface_figures.borrow() as (fig, ax):
+        # Plot the surface of the objective function
+        counts = {'rcount': Z.shape[0], 'ccount': Z.shape[1]} if full_resolution else {}
+        ax.plot_surface(X, Y, Z, cmap='plasma', alpha=0.6, **counts)  # Use 'plasma' colormap with transparency
+        ax.set_xlabel(x_label)  # Label for the x-axis
+        ax.set_ylabel(y_label)  # Label for the y-axis
+        ax.set_zlabel('Objective Value')  # Label for the z-axis
+        ax.set_title('Objective Function Surface')  # Title of the plot
+
+        # Save the plot to a buffer in PNG format
+        buf = io.BytesIO()  # Create an in-memory bytes buffer
+        fig.savefig(buf, format="png")  # Save the plot to the buffer
+
+    # Return the PNG bytes
+    return buf.getvalue()
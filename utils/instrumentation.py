@@ -0,0 +1,278 @@
+import collections  # Sample counts of the profiler
+import contextlib  # Stage context manager
+import contextvars  # The run metrics of the current request or job
+import os  # Page size and resetting the RSS sampler after a fork
+import sys  # Stack frames of the profiled thread
+import threading  # Profiler sampling thread
+import time  # High resolution timer
+import tracemalloc  # Traced peak memory
+
+from utils.metrics import STAGE_DURATION, EVALUATIONS  # Aggregated histograms of the web process
+
+_current = contextvars.ContextVar('run_metrics', default=None)
+RSS_SAMPLE_INTERVAL = 0.01  # Seconds between two samples of the process RSS
+
+
+def _current_rss():
+    """Resident set size of the process in bytes, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class _RSSSampler:
+    """
+    Background thread sampling the RSS of the process while collectors are active.
+
+    Every active RunMetrics keeps the highest RSS seen between its activation and deactivation,
+    so the figure covers the lifetime of one request or job. RSS is a property of the whole
+    process: with concurrent requests it includes their memory too.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._active = set()  # RunMetrics being sampled
+        self._thread = None
+
+    def add(self, metrics):
+        rss = _current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            metrics.peak_memory_bytes = rss
+            self._active.add(metrics)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pso-rss-sampler', daemon=True)
+                self._thread.start()
+
+    def remove(self, metrics):
+        rss = _current_rss()
+        with self._lock:
+            if metrics in self._active:
+                self._active.discard(metrics)
+                if rss is not None:
+                    metrics.peak_memory_bytes = max(metrics.peak_memory_bytes, rss)
+
+    def _run(self):
+        while True:
+            rss = _current_rss()
+            with self._lock:
+                if not self._active:
+                    self._thread = None  # Restarted by the next add()
+                    return
+                if rss is not None:
+                    for metrics in self._active:
+                        metrics.peak_memory_bytes = max(metrics.peak_memory_bytes, rss)
+            time.sleep(self.interval)
+
+
+_rss_sampler = _RSSSampler()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_rss_sampler._reset)  # The sampling thread is not inherited
+
+# Only one collector traces allocations at a time, so no collector resets or stops another one's trace
+_tracing_lock = threading.Lock()
+
+
+class RunMetrics:
+    """
+    Stage timings, counters and peak memory of one request or job.
+
+    Stages are timed with `stage(name)` anywhere below the code that activated the collector,
+    so the run pipeline does not need to pass it around. Timings of repeated stages add up.
+
+    The peak memory is reported with its source: 'process_rss', the highest RSS of the whole
+    process sampled while the collector was active, or 'traced', the peak of the allocations
+    traced by tracemalloc while it was active (in every thread of the process).
+    """
+
+    def __init__(self, trace_memory=False):
+        """
+        Args:
+            trace_memory (bool): Trace allocations with tracemalloc (slower). Only one collector traces
+                                 at a time; collectors that overlap with it sample the RSS instead.
+        """
+        self.timings = collections.OrderedDict()  # stage -> seconds
+        self.counters = collections.OrderedDict()  # name -> count
+        self.trace_memory = trace_memory
+        self.started = time.perf_counter()
+        self.peak_memory_bytes = None
+        self.peak_memory_source = None  # 'traced' or 'process_rss'
+        self._token = None
+        self._tracing = False  # Holds _tracing_lock
+        self._started_tracing = False
+
+    def activate(self):
+        """Make this the collector of the current context and start measuring the peak memory."""
+        self._token = _current.set(self)
+        if self.trace_memory and _tracing_lock.acquire(blocking=False):
+            self._tracing = True
+            self.peak_memory_source = 'traced'
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        else:
+            self.peak_memory_source = 'process_rss'
+            _rss_sampler.add(self)
+        return self
+
+    def deactivate(self):
+        """Stop collecting and record the peak memory; calling it again has no effect."""
+        if self._tracing:
+            self.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+            self._tracing = False
+            _tracing_lock.release()
+        elif self.peak_memory_source == 'process_rss':
+            _rss_sampler.remove(self)
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+
+    def detach(self):
+        """Stop being the collector of the current context, but keep measuring the peak memory."""
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+
+    def wrap_stream(self, chunks):
+        """
+        Return an iterable over the chunks of a streamed response that makes this the current
+        collector while every chunk is produced, so stages that run after the request handler
+        returned are recorded too. Call `detach` first, and `deactivate` when the response is closed.
+        """
+        return _MeasuredStream(chunks, self)
+
+    def add_time(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def add_count(self, name, amount):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Format the stage timings as a Server-Timing header value (durations in milliseconds)."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.timings.items()]
+        entries.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ', '.join(entries)
+
+    def to_dict(self):
+        """Return the timings, counters and peak memory as plain data, e.g. for logs or job results."""
+        return {
+            'timings': {name: round(seconds, 6) for name, seconds in self.timings.items()},
+            'counters': dict(self.counters),
+            'peak_memory_bytes': self.peak_memory_bytes,
+            'peak_memory_source': self.peak_memory_source,
+        }
+
+
+class _MeasuredStream:
+    """Iterable returned by `RunMetrics.wrap_stream`; closing it closes the wrapped chunks."""
+
+    def __init__(self, chunks, metrics):
+        self._chunks = chunks
+        self._iterator = iter(chunks)
+        self._metrics = metrics
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = _current.set(self._metrics)
+        try:
+            return next(self._iterator)
+        finally:
+            _current.reset(token)
+
+    def close(self):
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def current():
+    """Return the RunMetrics of the current request or job, or None."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Time the enclosed block as stage `name` of the current run; a no-op without a collector."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(name, time.perf_counter() - start)
+
+
+def count(name, amount):
+    """Add to counter `name` of the current run, e.g. the number of objective evaluations."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_count(name, amount)
+
+
+def observe_run(run_metrics):
+    """Add the stage timings and evaluations of a run (a RunMetrics or its `to_dict()`) to the histograms."""
+    data = run_metrics.to_dict() if isinstance(run_metrics, RunMetrics) else run_metrics
+    for name, seconds in data.get('timings', {}).items():
+        STAGE_DURATION.observe(seconds, stage=name)
+    evaluations = data.get('counters', {}).get('evaluations')
+    if evaluations:
+        EVALUATIONS.inc(evaluations)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of one thread: a background thread samples its stack at a fixed interval.
+
+    The result is in the collapsed-stack format ("outer;inner;leaf count" per line) that flame
+    graph tools read. Sampling costs nothing in the profiled thread itself.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = collections.Counter()  # Collapsed stack -> number of samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='pso-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples as collapsed stacks, most frequent first."""
+        return ''.join(f"{stack} {samples}\n" for stack, samples in self.samples.most_common())
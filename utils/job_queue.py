@@ -0,0 +1,168 @@
+import multiprocessing  # Shared progress dictionary between the web process and the workers
+import threading  # Lock protecting the job table
+import time  # Job timestamps
+import uuid  # Job identifiers
+from concurrent.futures import ProcessPoolExecutor  # Bounded pool of worker processes
+
+from utils.pso_runner import execute_run, sandbox_pool, RunError  # The optimization and rendering stages
+from utils.instrumentation import RunMetrics, observe_run  # Stage timings of the job
+from utils.figures import prewarm as prewarm_figures  # Loading the plotting stack when a worker starts
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is rejected because the pool or the client's share of it is saturated."""
+
+    def __init__(self, message, status_code=503):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def run_job(job_id, run_config, num_points, progress):
+    """
+    Execute one run in a worker process and report its progress.
+
+    Args:
+        job_id (str): The identifier of the job.
+        run_config (dict): Run configuration as produced by `shell.parse_run_request`.
+        num_points (int): The number of plot points per dimension.
+        progress: Shared dictionary (manager proxy) receiving `{job_id: {...}}` progress updates.
+
+    Returns:
+        dict: `{"payload": ...}` on success or `{"error": ..., "status_code": ...}` on failure,
+              with the stage timings of the job under `metrics`.
+    """
+    max_iterations = run_config['params']['max_iterations']
+    progress[job_id] = {'status': 'running', 'iteration': 0, 'max_iterations': max_iterations}
+
+    def report(iteration, max_iterations):
+        progress[job_id] = {'status': 'running', 'iteration': iteration, 'max_iterations': max_iterations}
+
+    def report_rendering(iterations_run):
+        # Early-stopped runs render before reaching max_iterations
+        progress[job_id] = {'status': 'rendering', 'iteration': iterations_run, 'max_iterations': max_iterations}
+
+    metrics = RunMetrics().activate()
+    try:
+        payload = execute_run(run_config, num_points, progress_callback=report, rendering_callback=report_rendering)
+    except RunError as e:
+        return {'error': e.message, 'status_code': e.status_code, 'metrics': metrics.to_dict()}
+    finally:
+        metrics.deactivate()
+    return {'payload': payload, 'metrics': metrics.to_dict()}
+
+
+def _start_worker():
+    """Start the custom function workers of a job worker and load its plotting stack; every job renders."""
+    sandbox_pool.start()  # Before loading Matplotlib, so the sandbox workers are forked from a small process
+    prewarm_figures()
+
+
+def _observe_job(future):
+    """Add the stage timings of a finished job to the metrics of the web process."""
+    if not future.cancelled() and future.exception() is None and 'metrics' in future.result():
+        observe_run(future.result()['metrics'])
+
+
+class JobManager:
+    """Runs PSO jobs in a bounded process pool and keeps track of their status and progress."""
+
+    def __init__(self, max_workers=2, max_queue_depth=8, max_jobs_per_client=2, job_ttl=600):
+        """
+        Args:
+            max_workers (int): Number of worker processes running jobs concurrently.
+            max_queue_depth (int): Number of jobs that may wait for a free worker.
+            max_jobs_per_client (int): Number of unfinished jobs a single client may have.
+            job_ttl (int): Seconds after which finished jobs are forgotten.
+        """
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.max_jobs_per_client = max_jobs_per_client
+        self.job_ttl = job_ttl
+        self._jobs = {}  # job_id -> job record
+        self._lock = threading.Lock()
+        self._executor = None  # Created on first use so importing the app does not start processes
+        self._manager = None
+        self._progress = None
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 initializer=_start_worker)
+
+    def _purge_expired(self, now):
+        """Drop finished jobs older than `job_ttl` seconds."""
+        for job_id, job in list(self._jobs.items()):
+            if job['future'].done() and now - job['submitted_at'] > self.job_ttl:
+                del self._jobs[job_id]
+                self._progress.pop(job_id, None)
+
+    def submit(self, client_id, run_config, num_points):
+        """
+        Queue a run and return its job id.
+
+        Raises:
+            JobQueueFull: With status 429 if the client has too many unfinished jobs,
+                          or 503 if the pool and its queue are full.
+        """
+        with self._lock:
+            self._ensure_started()
+            now = time.time()
+            self._purge_expired(now)
+
+            unfinished = [job for job in self._jobs.values() if not job['future'].done()]
+            if sum(job['client_id'] == client_id for job in unfinished) >= self.max_jobs_per_client:
+                raise JobQueueFull("Too many unfinished jobs for this client.", 429)
+            if len(unfinished) >= self.max_workers + self.max_queue_depth:
+                raise JobQueueFull("The job queue is full, try again later.", 503)
+
+            job_id = uuid.uuid4().hex
+            self._progress[job_id] = {
+                'status': 'queued', 'iteration': 0, 'max_iterations': run_config['params']['max_iterations']
+            }
+            future = self._executor.submit(run_job, job_id, run_config, num_points, self._progress)
+            future.add_done_callback(_observe_job)
+            self._jobs[job_id] = {'client_id': client_id, 'future': future, 'submitted_at': now}
+            return job_id
+
+    def status(self, job_id):
+        """
+        Report the status of a job.
+
+        Returns:
+            dict or None: Status, progress and (when finished) the payload or error; None for unknown jobs.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            progress = dict(self._progress.get(job_id, {}))
+
+        result = {
+            'job_id': job_id,
+            'status': progress.get('status', 'queued'),
+            'progress': {'iteration': progress.get('iteration', 0), 'max_iterations': progress.get('max_iterations')},
+        }
+        future = job['future']
+        if future.done():
+            try:
+                outcome = future.result()
+            except Exception as e:  # The worker process died or the result could not be transferred
+                outcome = {'error': f"Job failed: {str(e)}", 'status_code': 500}
+            if 'metrics' in outcome:
+                result['metrics'] = outcome['metrics']
+            if 'payload' in outcome:
+                result['status'] = 'finished'
+                result['result'] = outcome['payload']
+            else:
+                result['status'] = 'failed'
+                result['error'] = outcome['error']
+                result['status_code'] = outcome['status_code']
+        return result
+
+    def queue_depth(self):
+        """Return the number of unfinished (queued or running) jobs."""
+        with self._lock:
+            return sum(not job['future'].done() for job in self._jobs.values())
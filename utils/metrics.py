@@ -0,0 +1,114 @@
+import bisect  # Histogram bucket lookup
+import threading  # Lock protecting the metric values
+
+# Default histogram buckets in seconds, from 1 ms to 2 minutes
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Buckets for byte sizes, from 1 MiB to 4 GiB
+BYTES_BUCKETS = tuple(2**power for power in range(20, 33))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observations per label combination."""
+
+    def __init__(self, name, documentation, label_names=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)  # First bucket whose upper bound is >= value
+        with self._lock:
+            values = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            if index < len(self.buckets):
+                values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, values in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, values):
+                    cumulative += count
+                    le = (('le', _format_value(bound)),)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, (('le', '+Inf'),))} {values[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(values[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    """The metrics of one process, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Metrics of the web process; job and sweep runs report their stage timings back to it
+registry = Registry()
+REQUEST_DURATION = registry.register(Histogram(
+    'pso_request_duration_seconds', 'Duration of HTTP requests until the response is returned.', ['endpoint']))
+REQUESTS = registry.register(Counter(
+    'pso_requests_total', 'Number of HTTP requests.', ['endpoint', 'status']))
+STAGE_DURATION = registry.register(Histogram(
+    'pso_stage_duration_seconds', 'Duration of the stages of a PSO run.', ['stage']))
+EVALUATIONS = registry.register(Counter(
+    'pso_objective_evaluations_total', 'Number of objective function evaluations.'))
+PEAK_MEMORY = registry.register(Histogram(
+    'pso_request_peak_memory_bytes',
+    'Peak memory while a request ran: process-wide RSS (source="process_rss") or traced allocations (source="traced").',
+    ['endpoint', 'source'], buckets=BYTES_BUCKETS))
@@ -1,28 +1,73 @@
-import math
+import numpy as np
 
+# Objective functions follow a batch calling convention: they take an (N, D) array of points and
+# return N scores. The predefined functions work for any number of dimensions D and reduce over the
+# last axis, so they also accept a single point and then return a single score.
+
+def batch_objective(function):
+    """
+    Mark a function as implementing the batch calling convention.
+
+    Args:
+        function (callable): A function taking an (N, D) array and returning N scores.
+
+    Returns:
+        callable: The same function, flagged so it is not wrapped by `as_batch_function`.
+    """
+    function.is_batch = True
+    return function
+
+def as_batch_function(objective_function):
+    """
+    Return a batch version of an objective function.
+
+    Batch functions are returned unchanged. Scalar callables taking a single point are wrapped
+    so that they are called once per row, which keeps existing custom functions working.
+
+    Args:
+        objective_function (callable): A batch or scalar objective function.
+
+    Returns:
+        callable: A function taking an (N, D) array and returning a 1-D float array of N scores.
+    """
+    if getattr(objective_function, 'is_batch', False):
+        return objective_function
+
+    def batch_function(points):
+        return np.array([objective_function(point) for point in points], dtype=float)
+
+    batch_function.is_batch = True
+    return batch_function
+
+@batch_objective
 def quadratic_function(variables):
-    x, y = variables
-    return x**2 + y**2
+    x = np.asarray(variables, dtype=float)  # Sphere function: sum of squares
+    return np.sum(x**2, axis=-1)
 
+@batch_objective
 def sine_function(variables):
-    x, y = variables
-    return math.sin(x) + math.sin(y)
+    x = np.asarray(variables, dtype=float)
+    return np.sum(np.sin(x), axis=-1)
 
+@batch_objective
 def exponential_decay(variables):
-    x, y = variables
-    return math.exp(-x**2 - y**2)
+    x = np.asarray(variables, dtype=float)
+    return np.exp(-np.sum(x**2, axis=-1))
 
+@batch_objective
 def logarithmic_function(variables):
-    x, y = variables
-    return math.log(x**2 + y**2 + 1)
+    x = np.asarray(variables, dtype=float)
+    return np.log(np.sum(x**2, axis=-1) + 1)
 
+@batch_objective
 def rastrigin_function(variables):
-    x, y = variables
-    return 20 + x**2 + y**2 - 10 * (math.cos(2 * math.pi * x) + math.cos(2 * math.pi * y))
+    x = np.asarray(variables, dtype=float)
+    return 10 * x.shape[-1] + np.sum(x**2 - 10 * np.cos(2 * np.pi * x), axis=-1)
 
+@batch_objective
 def ackley_function(variables):
-    x, y = variables
-    return -20 * math.exp(-0.2 * math.sqrt(0.5 * (x**2 + y**2))) - math.exp(0.5 * (math.cos(2 * math.pi * x) + math.cos(2 * math.pi * y))) + math.e + 20
+    x = np.asarray(variables, dtype=float)
+    return -20 * np.exp(-0.2 * np.sqrt(np.mean(x**2, axis=-1))) - np.exp(np.mean(np.cos(2 * np.pi * x), axis=-1)) + np.e + 20
 
 # Mapping of function names to functions
 predefined_functions = {
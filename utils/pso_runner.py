@@ -0,0 +1,354 @@
+import math  # Sampling interval of the recorded history
+import os  # Environment-based configuration
+from models.pso import PSO, IslandPSO  # Import the PSO class
+from models.history import HistoryRecorder  # Bounded recording of the swarm positions
+from utils.objective_functions import predefined_functions  # Predefined objective functions
+from utils.expression_compiler import compile_expression, normalize_expression, ExpressionError  # Safe, cached compilation of custom functions
+from utils.file_handling import format_results_text  # Text file with the best particle positions
+from utils.artifact_store import ArtifactStore  # Generated files served by URL
+from utils.result_cache import ResultCache, make_cache_key  # Cache of seeded runs
+from utils.surface_grid import surface_cache  # Objective surface shared by both renderers
+from utils.instrumentation import stage, count  # Stage timings of the current request or job
+from utils.sandbox import SandboxPool  # Resource-limited evaluation of custom functions
+
+# Results of seeded runs, shared across requests (and across worker processes through the disk tier)
+result_cache = ResultCache(
+    max_memory_bytes=int(os.environ.get('PSO_RESULT_CACHE_BYTES', 64 * 1024 * 1024)),
+    directory=os.environ.get('PSO_RESULT_CACHE_DIR') or None,
+)
+
+# Generated plots, animations and text files; the directory is shared with the job worker processes
+artifact_store = ArtifactStore(
+    directory=os.environ.get('PSO_ARTIFACT_DIR') or None,
+    ttl=int(os.environ.get('PSO_ARTIFACT_TTL', 3600)),
+    max_bytes=int(os.environ.get('PSO_ARTIFACT_MAX_BYTES', 1024 * 1024 * 1024)),
+)
+ARTIFACT_KEYS = ('surface_plot_id', 'animation_id', 'text_file_id')  # Artifact ids in a run result
+
+# Recorded swarm histories larger than this are memory-mapped to a file in PSO_HISTORY_DIR
+HISTORY_SPILL_BYTES = int(os.environ.get('PSO_HISTORY_SPILL_BYTES', 256 * 1024 * 1024))
+HISTORY_DIR = os.environ.get('PSO_HISTORY_DIR') or None
+
+# Worker processes evaluating custom functions under CPU, memory and time limits; 0 workers
+# evaluates them in the calling process instead
+sandbox_pool = SandboxPool(
+    max_workers=int(os.environ.get('PSO_SANDBOX_WORKERS', 2)),
+    cpu_seconds=float(os.environ.get('PSO_SANDBOX_CPU_SECONDS', 5)),
+    memory_bytes=int(os.environ.get('PSO_SANDBOX_MEMORY_MB', 512)) * 1024 * 1024 or None,
+    call_timeout=float(os.environ.get('PSO_SANDBOX_CALL_TIMEOUT', 10)),
+    run_timeout=float(os.environ.get('PSO_SANDBOX_RUN_TIMEOUT', 60)),
+)
+
+
+class RunError(Exception):
+    """Raised when a PSO run fails; carries the HTTP status code that should be reported."""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def validate_objective_function(run_config):
+    """
+    Return the compiled custom function or the predefined function of a run configuration.
+
+    Custom functions are compiled (and cached) but not wrapped for the sandbox pool, so
+    validating a request does not start any worker processes.
+
+    Raises:
+        ExpressionError: If a custom function is invalid.
+        ValueError: If the objective function choice is unknown.
+    """
+    choice = run_config.get('objective_function_choice', 'quadratic')
+    if run_config.get('custom_function_code') or choice == 'custom':
+        # Custom function from the uploaded file or the form
+        return compile_expression(run_config.get('custom_function_code') or run_config.get('math_expr'))
+    if choice in predefined_functions:
+        return predefined_functions[choice]
+    raise ValueError("Invalid objective function choice.")
+
+
+def build_objective_function(run_config):
+    """
+    Build the objective function described by a run configuration.
+
+    Args:
+        run_config (dict): Run configuration as produced by `shell.parse_run_request`.
+
+    Custom functions are validated here and evaluated in the sandbox pool; build a new function
+    for every run, since it carries the run's evaluation time budget.
+
+    Returns:
+        callable: The objective function to optimize.
+
+    Raises:
+        ExpressionError: If a custom function is invalid.
+        ValueError: If the objective function choice is unknown.
+    """
+    function = validate_objective_function(run_config)
+    if function not in predefined_functions.values():
+        if sandbox_pool.max_workers > 0:
+            # Islands evaluate in the workers of this process: one worker per island
+            return sandbox_pool.function(function.expression, parallel=run_config['params'].get('islands', 1))
+    return function
+
+
+def create_history_recorder(params, mode=None, dtype=None):
+    """
+    Create the history recorder of a run.
+
+    By default every k-th iteration is recorded, with k chosen so that about `max_frames`
+    iterations are kept: the animation does not show more frames than that anyway. Positions are
+    stored in the recorder's compact float32 unless `dtype` asks for more, e.g. float for exports.
+    """
+    mode = mode or params.get('history_mode', 'all')
+    max_frames = params.get('max_frames') or params['max_iterations']
+    every = params.get('history_every') or max(1, math.ceil(params['max_iterations'] / max_frames))
+    options = {} if dtype is None else {'dtype': dtype}
+    return HistoryRecorder(
+        mode=mode, every=every, capacity=max(2, params.get('history_capacity') or max_frames),
+        spill_bytes=HISTORY_SPILL_BYTES, directory=HISTORY_DIR, seed=params.get('seed'), **options,
+    )
+
+
+def create_pso(run_config, objective_function, history_mode=None, history_dtype=None):
+    """
+    Create a PSO instance from the parameters of a run configuration.
+
+    Args:
+        history_mode (str, optional): Overrides the history mode of the parameters, e.g. 'off' for streaming.
+        history_dtype (optional): Storage type of the recorded positions, e.g. float for exports;
+                                  defaults to float32, which is enough for rendering.
+    """
+    params = run_config['params']
+    arguments = dict(
+        bounds=params['bounds'],
+        num_particles=params['num_particles'],
+        max_iterations=params['max_iterations'],
+        is_maximization=params['is_maximization'],
+        inertia=params['inertia'],
+        cognitive=params['cognitive'],
+        social=params['social'],
+        max_velocity=params.get('max_velocity'),
+        final_inertia=params.get('final_inertia'),
+        constriction=params.get('constriction', False),
+        topology=params.get('topology', 'gbest'),
+        neighborhood_size=params.get('neighborhood_size', 3),
+        seed=params.get('seed'),
+        patience=params.get('patience'),
+        tolerance=params.get('tolerance', 0.0),
+        target_score=params.get('target_score'),
+        min_diameter=params.get('min_diameter'),
+        time_budget=params.get('time_budget'),
+        history_recorder=create_history_recorder(params, history_mode, history_dtype)
+    )
+    if params.get('islands', 1) > 1:  # Island model: one worker process per sub-swarm
+        return IslandPSO(objective_function, num_islands=params['islands'],
+                         migration_interval=params.get('migration_interval', 10), **arguments)
+    return PSO(objective_function, **arguments)
+
+
+def convergence_summary(pso):
+    """Return why a finished run stopped, how much work early stopping saved and when the target was reached."""
+    return {
+        'stop_reason': pso.stop_reason,
+        'iterations': pso.iterations_run,
+        'evaluations': pso.evaluations,
+        'evaluations_saved': pso.evaluations_saved,
+        'evaluations_to_target': pso.evaluations_to_target,
+    }
+
+
+def run_cache_key(run_config, num_points):
+    """
+    Return the result cache key of a run configuration, or None if the run is not cacheable.
+
+    Only seeded runs are cached, because unseeded runs are not reproducible; neither are runs with
+    a time budget, whose stopping iteration depends on the machine's load.
+    """
+    params = run_config['params']
+    if params.get('seed') is None or params.get('time_budget') is not None:
+        return None
+    if run_config.get('custom_function_code'):
+        objective = {'custom_function_code': normalize_expression(run_config['custom_function_code'])}
+    elif run_config.get('objective_function_choice') == 'custom':
+        objective = {'math_expr': normalize_expression(run_config.get('math_expr') or '')}
+    else:
+        objective = {'name': run_config.get('objective_function_choice', 'quadratic')}
+    return make_cache_key(objective, params, num_points)
+
+
+def execute_run(run_config, num_points, progress_callback=None, rendering_callback=None):
+    """
+    Run the optimization and rendering stages for one run configuration.
+
+    The configuration only holds plain data, so this function can also run in a worker process.
+    The generated files are written to the artifact store, which is shared between processes.
+
+    Args:
+        run_config (dict): Run configuration as produced by `shell.parse_run_request`.
+        num_points (int): The number of plot points per dimension.
+        progress_callback (callable, optional): Called as `progress_callback(iteration, max_iterations)`
+                                                after every PSO iteration.
+        rendering_callback (callable, optional): Called as `rendering_callback(iterations_run)` when the
+                                                 optimization has finished, also after an early stop,
+                                                 and the rendering starts.
+
+    Returns:
+        dict: Artifact ids of the 3D plot (`surface_plot_id`), the animation (`animation_id`; GIF, or
+              a video if requested and an encoder is available) and the best particle text file
+              (`text_file_id`), plus the `animation_mime_type` and the `convergence_summary`.
+
+    Raises:
+        RunError: If the objective function, the optimization or the rendering fails.
+    """
+    # Seeded runs that were computed before are served from the result cache, as long as
+    # their artifacts have not expired
+    with stage('cache'):
+        cache_key = run_cache_key(run_config, num_points)
+        cached = result_cache.get(cache_key) if cache_key else None
+        if cached is not None and all(artifact_store.exists(cached[key]) for key in ARTIFACT_KEYS):
+            return dict(cached)
+
+    pso = optimize_run(run_config, progress_callback)
+    if rendering_callback is not None:
+        rendering_callback(pso.iterations_run)
+    result = render_artifacts(pso, run_config, num_points)
+    if cache_key and pso.stop_reason != 'time_budget':  # A run cut short by the clock is not reproducible
+        result_cache.put(cache_key, result)
+    return result
+
+
+def optimize_run(run_config, progress_callback=None, history_mode=None, history_dtype=None):
+    """
+    Build the objective function and the swarm of a run configuration and optimize it.
+
+    Args:
+        run_config (dict): Run configuration as produced by `shell.parse_run_request`.
+        progress_callback (callable, optional): Called as `progress_callback(iteration, max_iterations)`.
+        history_mode (str, optional): Overrides the history mode, e.g. 'off' when nothing is rendered.
+        history_dtype (optional): Storage type of the recorded positions, see `create_pso`.
+
+    Returns:
+        PSO: The optimized swarm.
+
+    Raises:
+        RunError: If the objective function or the optimization fails.
+    """
+    try:
+        with stage('compile'):
+            objective_function = build_objective_function(run_config)
+    except ValueError as e:
+        raise RunError(str(e), 400) from None
+
+    # Run the PSO algorithm
+    try:
+        pso = create_pso(run_config, objective_function, history_mode, history_dtype)
+        with stage('optimize'):
+            pso.optimize(progress_callback=progress_callback)  # Perform optimization
+    except ExpressionError as e:
+        raise RunError(str(e), 400) from None
+    except Exception as e:
+        raise RunError(f"Error during PSO optimization: {str(e)}", 500) from None
+    count('evaluations', pso.evaluations)
+    return pso
+
+
+def render_artifacts(pso, run_config, num_points):
+    """
+    Render the plots and the results file of an optimized swarm and store them as artifacts.
+
+    Returns:
+        dict: The artifact ids and the convergence summary, see `execute_run`.
+
+    Raises:
+        RunError: If evaluating the objective function for the plots fails.
+    """
+    # The renderers load Pillow (and, on first use, Matplotlib), which runs that never render do not need
+    from utils.animation_generator import render_animation  # Animation of the PSO results
+    from utils.image_generator import render_3d_graph  # 3D plot of the objective function
+
+    try:
+        with stage('results_text'):
+            results_text = format_results_text(pso, run_config.get('math_expr'), run_config.get('custom_function_code'))
+        # Plots show two dimensions; for more dimensions they are a slice through the global best or the center
+        dims = tuple(run_config['params'].get('plot_dims', (0, 1)))
+        anchor = pso.global_best_position if run_config['params'].get('slice_anchor', 'best') == 'best' else None
+        quality = run_config['params'].get('plot_quality', 'fixed')  # Adaptive levels ignore num_points
+        with stage('surface'):
+            surface = surface_cache.get_surface(pso.objective_function, pso.bounds, num_points, dims, anchor,
+                                                quality=quality)  # Computed once for both plots
+        with stage('plot_3d'):
+            surface_plot = render_3d_graph(pso.objective_function, pso.bounds, num_points, surface=surface, dims=dims,
+                                           full_resolution=quality != 'fixed')
+        with stage('animation'):
+            animation_bytes, animation_mime_type = render_animation(
+                pso, num_points, surface=surface, dims=dims,
+                max_frames=run_config['params'].get('max_frames'),
+                video_format=run_config['params'].get('animation_format', 'gif')
+            )
+    except ExpressionError as e:
+        raise RunError(str(e), 400) from None
+
+    with stage('store'):
+        result = {
+            'surface_plot_id': artifact_store.put(surface_plot, 'image/png'),
+            'animation_id': artifact_store.put(animation_bytes, animation_mime_type),
+            'animation_mime_type': animation_mime_type,
+            'text_file_id': artifact_store.put(results_text, 'text/plain'),
+            **convergence_summary(pso),
+        }
+    return result
+
+
+def stream_run(run_config):
+    """
+    Run the optimization and yield one event per iteration, for live streaming to the browser.
+
+    No files or images are rendered; the client draws the swarm itself.
+
+    Args:
+        run_config (dict): Run configuration as produced by `shell.parse_run_request`.
+
+    Yields:
+        tuple: `(event, data)` pairs with JSON-serializable data: one `start` event with the bounds,
+               one `iteration` event per iteration and a final `done` event with the best result.
+
+    Raises:
+        RunError: If the objective function or the optimization fails.
+    """
+    try:
+        with stage('compile'):
+            objective_function = build_objective_function(run_config)
+        pso = create_pso(run_config, objective_function, history_mode='off')  # Frames are streamed, not kept
+    except ValueError as e:
+        raise RunError(str(e), 400) from None
+
+    yield 'start', {'bounds': pso.bounds, 'max_iterations': pso.max_iterations, 'num_particles': pso.num_particles,
+                    'plot_dims': list(run_config['params'].get('plot_dims', (0, 1)))}
+    iterations = pso.iterate()
+    try:
+        while True:
+            with stage('optimize'):  # The iterations only, not the time the client takes to read them
+                state = next(iterations, None)
+            if state is None:
+                break
+            yield 'iteration', {
+                'iteration': state['iteration'],
+                'positions': state['positions'].tolist(),
+                'global_best_position': state['global_best_position'].tolist(),
+                'global_best_score': state['global_best_score'],
+            }
+    except ExpressionError as e:
+        raise RunError(str(e), 400) from None
+    except Exception as e:
+        raise RunError(f"Error during PSO optimization: {str(e)}", 500) from None
+    finally:
+        iterations.close()  # Stops island workers when the client goes away
+    count('evaluations', pso.evaluations)
+    yield 'done', {
+        'global_best_position': pso.global_best_position.tolist(),
+        'global_best_score': float(pso.global_best_score),
+        **convergence_summary(pso),
+    }
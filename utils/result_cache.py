@@ -0,0 +1,141 @@
+import hashlib  # Content-addressed cache keys
+import json  # Canonical serialization of keys and entries
+import os  # File system access for the on-disk backend
+import threading  # Lock protecting the in-memory tier
+from collections import OrderedDict  # LRU ordering of the in-memory tier
+
+
+def make_cache_key(objective, params, num_points):
+    """
+    Build the content-addressed key of a PSO run.
+
+    Args:
+        objective (dict): Identity of the objective function, e.g. {"name": "ackley"} or
+                          {"math_expr": "<normalized expression>"}.
+        params (dict): The PSO parameters (bounds, swarm parameters and seed).
+        num_points (int): The number of plot points per dimension.
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON representation of the run.
+    """
+    description = {'objective': objective, 'params': params, 'num_points': num_points}
+    canonical = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of finished PSO runs: an in-memory LRU tier and an optional on-disk tier.
+
+    Both tiers are bounded by the total size of the stored entries and evict the least
+    recently used entries first. Entries are JSON-serializable dictionaries, such as the
+    artifact ids and the convergence summary of a finished run.
+    """
+
+    def __init__(self, max_memory_bytes=64 * 1024 * 1024, directory=None, max_disk_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            max_memory_bytes (int): Size limit of the in-memory tier.
+            directory (str, optional): Directory of the on-disk tier; None keeps entries in memory only.
+            max_disk_bytes (int): Size limit of the on-disk tier.
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # key -> (entry, size in bytes)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _entry_size(entry):
+        return len(json.dumps(entry))
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached entry for `key`, or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)  # Mark as most recently used
+                self.hits += 1
+                return self._entries[key][0]
+
+        entry = self._read_from_disk(key) if self.directory else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_in_memory(key, entry)  # Promote to the in-memory tier
+        return entry
+
+    def put(self, key, entry):
+        """Store an entry in both tiers."""
+        with self._lock:
+            self._store_in_memory(key, entry)
+        if self.directory:
+            self._write_to_disk(key, entry)
+
+    def _store_in_memory(self, key, entry):
+        size = self._entry_size(entry)
+        if size > self.max_memory_bytes:
+            return  # Entries larger than the whole tier are only kept on disk
+        if key in self._entries:
+            self._memory_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (entry, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)  # Evict the least recently used entry
+            self._memory_bytes -= evicted_size
+
+    def _read_from_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # The modification time doubles as the last-use time for eviction
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write_to_disk(self, key, entry):
+        path = self._disk_path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temporary_path, path)  # Atomic, so concurrent workers never read a partial entry
+        self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        """Remove the least recently used files until the on-disk tier fits its size limit."""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue  # Removed by another process
+            files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+    def info(self):
+        """Return hit/miss counts and the size of the in-memory tier."""
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries), 'memory_bytes': self._memory_bytes,
+            }
@@ -0,0 +1,347 @@
+import math  # CPU limits in whole seconds
+import multiprocessing  # Pre-forked evaluation workers
+import os  # Process ids and page size
+import queue  # Idle workers
+import signal  # CPU limit notification
+import threading  # Lock protecting the pool, serving forked processes
+import time  # Wall-clock time-outs
+from multiprocessing.connection import Listener, Client  # Evaluations requested by forked processes
+
+import numpy as np  # Library for numerical operations
+
+from utils.expression_compiler import compile_expression, ExpressionError  # Validated custom expressions
+
+try:
+    import resource  # CPU and address space limits (Unix only)
+except ImportError:
+    resource = None
+
+
+class _CPUTimeExceeded(Exception):
+    """Raised inside a worker when an evaluation uses up its CPU time."""
+
+
+def _raise_cpu_time_exceeded(signum, frame):
+    raise _CPUTimeExceeded()
+
+
+def _address_space_bytes():
+    """Size of the current address space, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _limit_cpu(seconds):
+    """Set the soft CPU limit to `seconds` from now, or remove it with None."""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + seconds)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+
+def _worker_main(connection, memory_bytes):
+    """
+    Evaluate expressions sent by the pool until the connection is closed.
+
+    Every message is `(expression, points, cpu_seconds)`; the reply is `('ok', scores)` or
+    `('error', message)`. The address space of the worker is capped at its size after start-up
+    plus `memory_bytes`, so NumPy raises MemoryError instead of exhausting the machine.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the parent
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _raise_cpu_time_exceeded)
+        baseline = _address_space_bytes()
+        if memory_bytes and baseline is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (baseline + memory_bytes, baseline + memory_bytes))
+
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            return  # The parent went away
+        except MemoryError:
+            return  # The points alone exceed the limit; the rest of the message is unread, so start over
+        if message is None:
+            return
+        expression, points, cpu_seconds = message
+        try:
+            _limit_cpu(cpu_seconds)
+            reply = ('ok', np.asarray(compile_expression(expression)(points), dtype=float))
+        except ExpressionError as e:
+            reply = ('error', str(e))
+        except _CPUTimeExceeded:
+            reply = ('error', f"The function exceeded the CPU time limit of {cpu_seconds:g} s.")
+        except MemoryError:
+            reply = ('error', "The function exceeded the memory limit.")
+        except Exception as e:
+            reply = ('error', f"Error evaluating the function: {e}")
+        finally:
+            try:
+                _limit_cpu(None)
+            except _CPUTimeExceeded:
+                pass  # The notification arrived after the evaluation finished
+        connection.send(reply)
+
+
+class _Worker:
+    """One sandbox process and the parent's end of its pipe."""
+
+    def __init__(self, context, memory_bytes):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection, memory_bytes),
+                                       name='pso-sandbox', daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def stop(self, kill=False):
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        self.connection.close()
+
+
+class SandboxPool:
+    """
+    Pre-forked, resource-limited worker processes that evaluate custom objective expressions.
+
+    Batches of points are sent to an idle worker, which evaluates the expression under a CPU
+    limit; the pool waits at most `call_timeout` seconds for the result and replaces workers that
+    time out or die.
+
+    The process that started the pool also serves it to the processes it forks afterwards: a
+    forked process that does not start its own workers (an island of `IslandPSO`) sends its
+    batches to the parent over a local connection, so it does not pay for forking workers of its
+    own; `function(expression, parallel=n)` grows the pool to at least one worker per island, so
+    the islands do not wait for each other. Processes that evaluate many runs (job and sweep workers) call `start` when they start up
+    and get their own workers instead.
+    """
+
+    def __init__(self, max_workers=2, cpu_seconds=5.0, memory_bytes=512 * 1024 * 1024, call_timeout=10.0,
+                 run_timeout=60.0):
+        """
+        Args:
+            max_workers (int): Number of evaluation processes; `function` may start more for parallel runs.
+            cpu_seconds (float): CPU time limit of one batch evaluation.
+            memory_bytes (int, optional): Memory a worker may allocate on top of its size after start-up;
+                                          None leaves the address space unlimited.
+            call_timeout (float): Wall-clock limit of one batch evaluation, including waiting for a worker.
+            run_timeout (float): Total evaluation time of one objective function, e.g. one PSO run and its plots.
+        """
+        self.max_workers = max_workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.call_timeout = call_timeout
+        self.run_timeout = run_timeout
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._idle = queue.Queue()
+        self._listener = None  # Accepts the connections of forked processes
+        self._address = None
+        self._client = None  # Connection of a forked process to the pool of its parent
+        self._client_pid = None
+
+    def _context(self):
+        if 'fork' in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('fork')  # Inherits the imported modules, so workers start warm
+        return multiprocessing.get_context()
+
+    def start(self, min_workers=0):
+        """
+        Start the workers of this process, and serve them to forked processes, if they are not running yet.
+
+        Args:
+            min_workers (int): Start more than `max_workers` workers if needed to have this many.
+        """
+        if self._pid != os.getpid():
+            self._reset()  # Forked: the inherited workers belong to the parent
+        with self._lock:
+            while len(self._workers) < max(self.max_workers, min_workers):
+                worker = _Worker(self._context(), self.memory_bytes)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            if self._listener is None and self._workers:
+                self._listener = Listener(authkey=multiprocessing.current_process().authkey)
+                self._address = self._listener.address
+                threading.Thread(target=self._serve, args=(self._listener,), name='pso-sandbox-server',
+                                 daemon=True).start()
+
+    def _serve(self, listener):
+        """Accept the connections of forked processes, one thread per connection."""
+        while True:
+            try:
+                connection = listener.accept()
+            except (multiprocessing.AuthenticationError, EOFError):
+                continue  # A client that failed the handshake
+            except OSError:
+                return  # The listener was closed
+            threading.Thread(target=self._serve_connection, args=(connection,), name='pso-sandbox-client',
+                             daemon=True).start()
+
+    def _serve_connection(self, connection):
+        """Evaluate the batches sent by one forked process until it closes the connection."""
+        with connection:
+            while True:
+                try:
+                    expression, points, timeout = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ('ok', self.evaluate(expression, points, timeout=timeout))
+                except ExpressionError as e:
+                    reply = ('error', str(e))
+                try:
+                    connection.send(reply)
+                except OSError:
+                    return
+
+    def _evaluate_in_parent(self, expression, points, timeout):
+        """Send a batch to the pool of the process that started it, see `evaluate`."""
+        if self._client_pid != os.getpid():
+            try:
+                self._client = Client(self._address, authkey=multiprocessing.current_process().authkey)
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                raise ExpressionError("The function evaluation workers are not available.") from None
+            self._client_pid = os.getpid()
+        try:
+            self._client.send((expression, np.asarray(points, dtype=float), timeout))
+            # The parent answers within the timeout; the margin covers replacing a stuck worker
+            if not self._client.poll(timeout + 5.0):
+                self._client_pid = None  # A late answer would be read by the next call: reconnect
+                self._client.close()
+                raise ExpressionError(f"Function evaluation timed out after {timeout:g} s.")
+            status, value = self._client.recv()
+        except (EOFError, OSError):
+            self._client_pid = None
+            raise ExpressionError("The function evaluation workers are not available.") from None
+        if status == 'error':
+            raise ExpressionError(value)
+        return value
+
+    def _replace(self, worker):
+        worker.stop(kill=True)
+        with self._lock:
+            self._workers.remove(worker)
+            replacement = _Worker(self._context(), self.memory_bytes)
+            self._workers.append(replacement)
+        self._idle.put(replacement)
+
+    def evaluate(self, expression, points, timeout=None):
+        """
+        Evaluate an expression at a batch of points in a worker.
+
+        Args:
+            expression (str): A normalized expression accepted by `compile_expression`.
+            points (np.ndarray): An (N, D) array of points.
+            timeout (float, optional): Wall-clock limit; defaults to `call_timeout`.
+
+        Returns:
+            np.ndarray: The N scores.
+
+        Raises:
+            ExpressionError: If the evaluation fails, exceeds a limit, or no worker becomes free in time.
+        """
+        timeout = self.call_timeout if timeout is None else min(timeout, self.call_timeout)
+        if self._pid != os.getpid() and self._address is not None:
+            return self._evaluate_in_parent(expression, points, timeout)  # Forked from the process serving the pool
+        self.start()
+        started = time.monotonic()
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise ExpressionError("All function evaluation workers are busy, try again later.") from None
+
+        try:
+            worker.connection.send((expression, np.asarray(points, dtype=float), self.cpu_seconds))
+            if not worker.connection.poll(max(0.0, timeout - (time.monotonic() - started))):
+                self._replace(worker)
+                raise ExpressionError(f"Function evaluation timed out after {timeout:g} s.")
+            status, value = worker.connection.recv()
+        except (EOFError, OSError):
+            self._replace(worker)
+            raise ExpressionError("The function evaluation worker stopped, e.g. by exceeding the memory limit.") from None
+        self._idle.put(worker)
+        if status == 'error':
+            raise ExpressionError(value)
+        return value
+
+    def function(self, expression, parallel=1):
+        """
+        Return a batch objective function evaluating `expression` in this pool.
+
+        Starts the pool, so the processes forked for the run (islands) find it running.
+
+        Args:
+            expression (str): A normalized expression accepted by `compile_expression`.
+            parallel (int): Number of processes evaluating the function at the same time, e.g. the
+                            islands of a run; the pool keeps at least one worker for each.
+        """
+        self.start(min_workers=parallel)
+        return SandboxedFunction(self, expression)
+
+    def shutdown(self):
+        """Stop the workers of this process."""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._idle = queue.Queue()
+            listener, self._listener, self._address = self._listener, None, None
+        if listener is not None:
+            listener.close()
+        for worker in workers:
+            worker.stop()
+
+
+class SandboxedFunction:
+    """
+    Batch objective function evaluated in a SandboxPool, with a total evaluation time budget.
+
+    The time used is kept in shared memory, so processes forked during the run (islands) draw on
+    the same budget instead of each getting a copy of it.
+    """
+
+    is_batch = True  # Batch calling convention, see utils.objective_functions
+
+    def __init__(self, pool, expression):
+        self.pool = pool
+        self.expression = expression
+        self._seconds_used = pool._context().Value('d', 0.0)
+
+    @property
+    def seconds_used(self):
+        """Evaluation time used so far by this function, in all processes of the run."""
+        return self._seconds_used.value
+
+    def __call__(self, points):
+        remaining = self.pool.run_timeout - self.seconds_used
+        if remaining <= 0:
+            raise ExpressionError(f"The function used up its evaluation time of {self.pool.run_timeout:g} s.")
+        points = np.asarray(points, dtype=float)
+        started = time.monotonic()
+        try:
+            scores = self.pool.evaluate(self.expression, points.reshape(-1, points.shape[-1]), timeout=remaining)
+        except ExpressionError:
+            if time.monotonic() - started >= remaining:
+                raise ExpressionError(f"The function used up its evaluation time of {self.pool.run_timeout:g} s.") from None
+            raise
+        finally:
+            with self._seconds_used.get_lock():
+                self._seconds_used.value += time.monotonic() - started
+        return scores.reshape(points.shape[:-1])
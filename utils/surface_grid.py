@@ -0,0 +1,231 @@
+import threading  # Lock protecting the cache
+from collections import OrderedDict, namedtuple  # LRU ordering and the grid record
+import numpy as np  # Library for numerical operations
+from utils.objective_functions import as_batch_function, predefined_functions  # Batch evaluation
+from utils.instrumentation import count  # Grid evaluations of the current request
+
+# Objective function values over a rectilinear grid: X and Y from np.meshgrid, Z the function values
+SurfaceGrid = namedtuple('SurfaceGrid', ['X', 'Y', 'Z'])
+
+# Settings of the adaptive sampler: points per axis of the initial grid, interpolation error (relative
+# to the value range) above which an interval is bisected, maximum points per axis, and evaluation budget
+SurfaceQuality = namedtuple('SurfaceQuality', ['initial_points', 'tolerance', 'max_points', 'budget'])
+PLOT_QUALITY_LEVELS = {
+    'draft': SurfaceQuality(initial_points=17, tolerance=0.02, max_points=50, budget=3_000),
+    'standard': SurfaceQuality(initial_points=25, tolerance=0.01, max_points=90, budget=10_000),
+    'high': SurfaceQuality(initial_points=33, tolerance=0.0025, max_points=180, budget=40_000),
+}
+# 'fixed' samples a regular NUM_POINTS x NUM_POINTS grid
+PLOT_QUALITIES = ('fixed',) + tuple(PLOT_QUALITY_LEVELS)
+
+# Names of the predefined functions, used as the cache identity of a function
+_PREDEFINED_NAMES = {function: name for name, function in predefined_functions.items()}
+
+
+def slice_anchor(bounds, dims, anchor=None):
+    """
+    Return the point through which a 2-D slice of the search space is taken.
+
+    Args:
+        bounds (list of tuples): The bounds of every dimension of the search space.
+        dims (tuple): The two dimensions spanned by the slice.
+        anchor (array-like, optional): Coordinates for the other dimensions; defaults to the center of the bounds.
+
+    Returns:
+        tuple or None: The anchor coordinates, or None for a 2-D search space where the slice is the whole space.
+    """
+    if len(bounds) == 2 and set(dims) == {0, 1}:
+        return None
+    if anchor is None:
+        anchor = [(lower + upper) / 2 for lower, upper in bounds]
+    return tuple(float(value) for value in anchor)
+
+
+def axis_labels(bounds, dims):
+    """Return the axis labels of a plot over two dimensions: X and Y in 2-D, x[i] and x[j] otherwise."""
+    if len(bounds) == 2 and tuple(dims) == (0, 1):
+        return 'X', 'Y'
+    return f"x[{dims[0]}]", f"x[{dims[1]}]"
+
+
+def compute_surface(objective_function, bounds, num_points, dims=(0, 1), anchor=None):
+    """
+    Evaluate the objective function over a num_points x num_points grid spanning two dimensions.
+
+    For more than two dimensions the grid is a 2-D slice: the other coordinates are held at the
+    anchor point, so the cost of the plot does not grow with the number of dimensions.
+
+    Args:
+        objective_function (callable): The function to evaluate (batch or scalar).
+        bounds (list of tuples): The bounds of every dimension of the search space.
+        num_points (int): The number of points in each dimension.
+        dims (tuple): The two dimensions spanned by the grid.
+        anchor (tuple, optional): Coordinates of the other dimensions, see `slice_anchor`.
+
+    Returns:
+        SurfaceGrid: The X, Y and Z arrays of the grid.
+    """
+    first, second = dims
+    x_vals = np.linspace(bounds[first][0], bounds[first][1], num_points)  # x range
+    y_vals = np.linspace(bounds[second][0], bounds[second][1], num_points)  # y range
+    batch_function = as_batch_function(objective_function)
+    Z = _evaluate_grid(batch_function, _base_point(bounds, anchor), dims, x_vals, y_vals)
+    count('surface_evaluations', Z.size)
+    X, Y = np.meshgrid(x_vals, y_vals)  # Create a 2D grid from x and y
+    return SurfaceGrid(X, Y, Z)
+
+
+def _base_point(bounds, anchor):
+    return np.asarray(anchor if anchor is not None else [0.0] * len(bounds), dtype=float)
+
+
+def _evaluate_grid(batch_function, base_point, dims, x_vals, y_vals):
+    """Evaluate the function at every (x, y) of the grid; returns a len(y_vals) x len(x_vals) array."""
+    X, Y = np.meshgrid(x_vals, y_vals)
+    grid_points = np.tile(base_point, (X.size, 1))
+    grid_points[:, dims[0]] = np.ravel(X)  # One row per grid point, varying only the two plotted dimensions
+    grid_points[:, dims[1]] = np.ravel(Y)
+    Z = batch_function(grid_points)  # Evaluate the whole grid in one call
+    return np.asarray(Z, dtype=float).reshape(X.shape)
+
+
+def compute_adaptive_surface(objective_function, bounds, quality='standard', dims=(0, 1), anchor=None):
+    """
+    Evaluate the objective function over a grid that is refined where the function varies quickly.
+
+    Sampling starts with a coarse regular grid. In every round the midpoints of the intervals that
+    are still being refined are evaluated, one axis at a time, across the whole grid; an interval is
+    bisected when the value at its midpoint differs from the linear interpolation of its ends by more
+    than the tolerance of the quality level (relative to the value range), and only bisected intervals
+    are checked again. Because the grid stays rectilinear, a column or row is added over the full
+    extent of the other axis. Refinement ends when every interval is smooth, an axis reaches the
+    maximum number of points, or the evaluation budget is spent; probes that are not kept count
+    against the budget too.
+
+    Args:
+        objective_function (callable): The function to evaluate (batch or scalar).
+        bounds (list of tuples): The bounds of every dimension of the search space.
+        quality (str): One of PLOT_QUALITY_LEVELS.
+        dims (tuple): The two dimensions spanned by the grid.
+        anchor (tuple, optional): Coordinates of the other dimensions, see `slice_anchor`.
+
+    Returns:
+        SurfaceGrid: The X, Y and Z arrays of the grid, with non-uniform spacing.
+    """
+    level = PLOT_QUALITY_LEVELS[quality]
+    batch_function = as_batch_function(objective_function)
+    base_point = _base_point(bounds, anchor)
+    axes = [np.linspace(bounds[dim][0], bounds[dim][1], level.initial_points) for dim in dims]  # x and y values
+    Z = _evaluate_grid(batch_function, base_point, dims, *axes)
+    evaluations = Z.size
+    active = [np.ones(len(values) - 1, dtype=bool) for values in axes]  # Intervals still being refined, per axis
+
+    refined = True
+    while refined:
+        refined = False
+        finite = Z[np.isfinite(Z)]
+        scale = np.ptp(finite) if finite.size else 0.0
+        if scale == 0:
+            break  # Constant (or undefined) surface: nothing to refine
+        for axis in (0, 1):
+            values, other = axes[axis], axes[1 - axis]
+            candidates = np.flatnonzero(active[axis])
+            room = level.max_points - len(values)
+            affordable = (level.budget - evaluations) // len(other)
+            if len(candidates) == 0 or room <= 0 or affordable <= 0:
+                continue
+            if len(candidates) > affordable:  # Spread the remaining budget evenly over the candidates
+                candidates = candidates[np.unique(np.linspace(0, len(candidates) - 1, affordable).astype(int))]
+
+            midpoints = (values[candidates] + values[candidates + 1]) / 2
+            grid_axes = (midpoints, other) if axis == 0 else (other, midpoints)
+            probes = _evaluate_grid(batch_function, base_point, dims, *grid_axes)
+            evaluations += probes.size
+            z = Z if axis == 0 else Z.T  # Columns of z run along the refined axis
+            probes = probes if axis == 0 else probes.T
+            linear = (z[:, candidates] + z[:, candidates + 1]) / 2
+            with np.errstate(invalid='ignore'):
+                error = np.nan_to_num(np.max(np.abs(probes - linear), axis=0) / scale, nan=0.0, posinf=1.0)
+
+            keep = error > level.tolerance
+            if keep.sum() > room:  # Keep the worst intervals that still fit
+                keep[:] = False
+                keep[np.argsort(error)[-room:]] = True
+            checked = active[axis].copy()
+            checked[candidates] = keep  # Smooth intervals are final
+            split = np.zeros(len(values) - 1, dtype=bool)
+            split[candidates[keep]] = True
+            if not split.any():
+                active[axis] = checked
+                continue
+
+            axes[axis] = np.insert(values, candidates[keep] + 1, midpoints[keep])
+            z = np.insert(z, candidates[keep] + 1, probes[:, keep], axis=1)
+            Z = z if axis == 0 else z.T
+            active[axis] = np.repeat(checked, np.where(split, 2, 1))  # Both halves of a split interval are checked again
+            refined = True
+
+    count('surface_evaluations', evaluations)
+    X, Y = np.meshgrid(*axes)
+    return SurfaceGrid(X, Y, np.ascontiguousarray(Z))
+
+
+class SurfaceCache:
+    """Bounded LRU cache of surface grids of the predefined objective functions."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._grids = OrderedDict()  # (function name, bounds, num_points or quality, dims, anchor) -> SurfaceGrid
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_surface(self, objective_function, bounds, num_points, dims=(0, 1), anchor=None, quality='fixed'):
+        """
+        Return the surface grid of a function, computing it only if it is not cached.
+
+        Grids of predefined functions are cached across requests and returned read-only;
+        other functions are always evaluated. With `quality` 'fixed' the grid is a regular
+        num_points x num_points grid (see `compute_surface`); with one of PLOT_QUALITY_LEVELS it is
+        sampled adaptively (see `compute_adaptive_surface`) and `num_points` is ignored.
+        """
+        dims = tuple(dims)
+        anchor = slice_anchor(bounds, dims, anchor)
+        resolution = num_points if quality == 'fixed' else quality
+
+        def compute():
+            if quality == 'fixed':
+                return compute_surface(objective_function, bounds, num_points, dims, anchor)
+            return compute_adaptive_surface(objective_function, bounds, quality, dims, anchor)
+
+        name = _PREDEFINED_NAMES.get(objective_function)
+        if name is None:
+            with self._lock:
+                self.misses += 1
+            return compute()
+
+        key = (name, tuple(tuple(float(value) for value in bound) for bound in bounds), resolution, dims, anchor)
+        with self._lock:
+            if key in self._grids:
+                self._grids.move_to_end(key)  # Mark as most recently used
+                self.hits += 1
+                return self._grids[key]
+            self.misses += 1
+
+        surface = compute()
+        for array in surface:
+            array.flags.writeable = False  # Shared between requests, so protect against modification
+        with self._lock:
+            self._grids[key] = surface
+            while len(self._grids) > self.max_entries:
+                self._grids.popitem(last=False)  # Evict the least recently used grid
+        return surface
+
+    def info(self):
+        """Return hit/miss counts and the number of cached grids."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._grids)}
+
+
+# Process-wide cache used by the renderers
+surface_cache = SurfaceCache()
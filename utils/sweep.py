@@ -0,0 +1,233 @@
+import csv  # CSV rows of the result table
+import io  # In-memory CSV formatting
+import itertools  # Cartesian product of the parameter grid
+import json  # JSON sweep specifications and rows
+import threading  # Lock protecting the lazily created pool
+import time  # Run timings
+from concurrent.futures import ProcessPoolExecutor, as_completed  # Parallel runs
+
+import numpy as np  # Convergence analysis
+
+from utils.pso_runner import optimize_run, render_artifacts, sandbox_pool, RunError  # Optimization and rendering stages
+from utils.instrumentation import RunMetrics, observe_run  # Stage timings of the runs
+
+# Parameters that can be swept; the values are passed to the run like form fields
+SWEEP_PARAMETERS = (
+    'inertia', 'cognitive', 'social', 'num_particles', 'max_iterations', 'bounds', 'dimensions',
+    'is_maximization', 'patience', 'tolerance', 'target_score', 'min_diameter', 'time_budget',
+    'topology', 'neighborhood_size', 'constriction', 'max_velocity', 'final_inertia',
+)
+
+# Columns of every result row; the swept parameters and the plot URLs are added per sweep
+RESULT_COLUMNS = (
+    'run', 'objective', 'seed', 'best_score', 'best_position', 'iterations', 'iterations_to_converge',
+    'evaluations', 'evaluations_to_target', 'stop_reason', 'optimize_seconds', 'render_seconds', 'total_seconds', 'error',
+)
+
+
+def parse_sweep(data):
+    """
+    Parse a sweep specification from JSON text or an already decoded dictionary.
+
+    The specification has the keys `base` (parameters shared by every run), `grid` (parameter ->
+    list of values, expanded as a Cartesian product), `sets` (list of parameter dictionaries),
+    `objectives` (names of predefined functions or {"math_expr": ...}), `seeds` (list of seeds or
+    a number n for seeds 0..n-1), and optionally `plot` and `format`.
+
+    Returns:
+        dict: The decoded specification.
+
+    Raises:
+        ValueError: If the specification is not valid JSON or not an object.
+    """
+    if isinstance(data, (bytes, str)):
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            raise ValueError(f"Invalid sweep specification: {str(e)}") from None
+    if not isinstance(data, dict):
+        raise ValueError("The sweep specification must be a JSON object.")
+    return data
+
+
+def _form_value(value):
+    """Convert a JSON value into the string a form field would carry."""
+    if isinstance(value, bool):
+        return 'on' if value else ''
+    return str(value)
+
+
+def expand_sweep(spec, max_runs):
+    """
+    Expand a sweep specification into one form-like dictionary per run.
+
+    Args:
+        spec (dict): The specification, see `parse_sweep`.
+        max_runs (int): Maximum number of runs in one sweep.
+
+    Returns:
+        tuple: The swept parameter names and a list of `(labels, form)` pairs, where `labels` holds
+               the objective, seed and swept values of the run and `form` can be passed to
+               `shell.parse_run_request`.
+
+    Raises:
+        ValueError: If the specification is invalid or has more than `max_runs` runs.
+    """
+    base = spec.get('base', {})
+    grid = spec.get('grid', {})
+    sets = spec.get('sets') or [{}]
+    objectives = spec.get('objectives') or ['quadratic']
+    seeds = spec.get('seeds', [0])
+    if isinstance(seeds, int):
+        seeds = list(range(seeds))
+    if not isinstance(base, dict) or not isinstance(grid, dict) or not isinstance(sets, list) \
+       or not isinstance(objectives, list) or not isinstance(seeds, list):
+        raise ValueError("Invalid sweep specification: base and grid must be objects; sets, objectives and seeds lists.")
+    if not all(isinstance(values, list) and values for values in grid.values()):
+        raise ValueError("Every grid parameter needs a non-empty list of values.")
+
+    swept = list(grid)
+    for parameter_set in sets:
+        if not isinstance(parameter_set, dict):
+            raise ValueError("Every entry of sets must be an object.")
+        swept.extend(key for key in parameter_set if key not in swept)
+    unknown = [key for key in list(base) + swept if key not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Parameters that cannot be swept: {', '.join(unknown)}. "
+                         f"Choose from {', '.join(SWEEP_PARAMETERS)}.")
+
+    num_runs = len(sets) * int(np.prod([len(values) for values in grid.values()])) * len(objectives) * len(seeds)
+    if num_runs > max_runs:
+        raise ValueError(f"The sweep has {num_runs} runs; at most {max_runs} are allowed.")
+
+    runs = []
+    for parameter_set in sets:
+        for grid_values in itertools.product(*grid.values()):
+            values = {**parameter_set, **dict(zip(grid, grid_values))}
+            for objective in objectives:
+                for seed in seeds:
+                    form = {key: _form_value(value) for key, value in {**base, **values}.items()}
+                    if isinstance(objective, dict) and 'math_expr' in objective:
+                        form['objective_function_choice'] = 'custom'
+                        form['math_expr'] = str(objective['math_expr'])
+                        label = str(objective['math_expr'])
+                    else:
+                        form['objective_function_choice'] = label = str(objective)
+                    form['seed'] = _form_value(seed)
+                    labels = {'objective': label, 'seed': seed, **{key: values.get(key) for key in swept}}
+                    runs.append((labels, form))
+    return swept, runs
+
+
+def iterations_to_converge(best_scores, tolerance=0.0):
+    """Return the first iteration (1-based) whose best score is within `tolerance` of the final best score."""
+    if len(best_scores) == 0:
+        return 0
+    close = np.abs(np.asarray(best_scores) - best_scores[-1]) <= tolerance
+    return int(np.argmax(close)) + 1
+
+
+def run_sweep_point(run_config, num_points, plot):
+    """
+    Optimize (and optionally render) one run of a sweep; executed in a worker process.
+
+    Returns:
+        dict: The result columns of the run; errors are reported in the `error` column and the
+              stage timings under `metrics`.
+    """
+    started = time.perf_counter()
+    row = {}
+    metrics = RunMetrics().activate()
+    try:
+        pso = optimize_run(run_config, history_mode=None if plot else 'off')  # Nothing to animate without plots
+        optimized = time.perf_counter()
+        row.update({
+            'best_score': float(pso.global_best_score),
+            'best_position': [float(value) for value in pso.global_best_position],
+            'iterations': pso.iterations_run,
+            'iterations_to_converge': iterations_to_converge(pso.recorder.best_scores,
+                                                             run_config['params'].get('tolerance') or 0.0),
+            'evaluations': pso.evaluations,
+            'evaluations_to_target': pso.evaluations_to_target,
+            'stop_reason': pso.stop_reason,
+            'optimize_seconds': round(optimized - started, 6),
+        })
+        if plot:
+            row['artifacts'] = render_artifacts(pso, run_config, num_points)
+            row['render_seconds'] = round(time.perf_counter() - optimized, 6)
+    except RunError as e:
+        row['error'] = e.message
+    finally:
+        metrics.deactivate()
+    row['metrics'] = metrics.to_dict()
+    row['total_seconds'] = round(time.perf_counter() - started, 6)
+    return row
+
+
+def _start_worker():
+    """Start the custom function workers of a sweep worker, so its first run does not fork them."""
+    sandbox_pool.start()
+
+
+class SweepRunner:
+    """Runs the runs of parameter sweeps in a shared, lazily started process pool."""
+
+    def __init__(self, max_workers=2, max_runs=1000):
+        """
+        Args:
+            max_workers (int): Number of worker processes shared by all sweeps.
+            max_runs (int): Maximum number of runs in one sweep.
+        """
+        self.max_workers = max_workers
+        self.max_runs = max_runs
+        self._executor = None  # Created on first use so importing the app does not start processes
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_start_worker)
+            return self._executor
+
+    def run(self, runs, num_points, plot=False):
+        """
+        Submit every run and yield the result rows in the order in which the runs finish.
+
+        Args:
+            runs (list): `(labels, run_config)` pairs.
+            num_points (int): The number of plot points per dimension, used when plotting.
+            plot (bool): Whether to render the plots and the results file of every run.
+
+        Yields:
+            dict: The labels of a run merged with its result columns and its `run` index.
+        """
+        executor = self._ensure_started()
+        futures = {
+            executor.submit(run_sweep_point, run_config, num_points, plot): (index, labels)
+            for index, (labels, run_config) in enumerate(runs)
+        }
+        try:
+            for future in as_completed(futures):
+                index, labels = futures[future]
+                try:
+                    row = future.result()
+                    observe_run(row.pop('metrics'))
+                except Exception as e:  # The worker process died or the result could not be transferred
+                    row = {'error': f"Run failed: {str(e)}"}
+                yield {'run': index, **labels, **row}
+        finally:
+            for future in futures:
+                future.cancel()  # The client went away: drop the runs that have not started
+
+
+def csv_row(row, columns):
+    """Format a result row as one CSV line; lists are written as space-separated numbers."""
+    buffer = io.StringIO()
+    values = []
+    for column in columns:
+        value = row.get(column)
+        if isinstance(value, list):
+            value = ' '.join(repr(item) for item in value)
+        values.append('' if value is None else value)
+    csv.writer(buffer, lineterminator='\n').writerow(values)
+    return buffer.getvalue()